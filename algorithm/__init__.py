@@ -4,10 +4,13 @@ number partitioning problem (MNP) solving
 """
 
 from .ant_colony_optimization import *
+from .batch import *
+from .dynamic import *
 from .exact import *
 from .greedy import *
 from .genetic import *
 from .karmarkar_karp import *
+from .portfolio import *
 from .simulated_annealing import *
 from .tabu_search import *
 from .random_solution import *
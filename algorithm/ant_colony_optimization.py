@@ -1,17 +1,31 @@
 import logging
-from collections import defaultdict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterator, Optional, Tuple
 
 import numpy as np
 
-from .random_solution import RandomSolver
-from core import AbstractSolver, Instance_T, PartialSolution
+from core import AnytimeSolver, Budget, Instance_T, Instance, PartialSolution
 
 
 logger = logging.getLogger(__name__)
 
+# number of Gumbel noise values drawn at once by _build_ants
+_NOISE_CHUNK = 1 << 16
 
-class ACO(AbstractSolver):
-    """ Ant Colony Optimizaiton algorithm """
+
+class ACO(AnytimeSolver):
+    """
+    Ant Colony Optimizaiton algorithm
+
+    Pheromones are stored in (items, sets, buckets) table,
+    bucket is the load of the set relative to mean load of already
+    placed items. All ants are built at once, item by item.
+
+    With workers > 1 ants of iteration are split between `pool`
+    ('thread' or 'process') workers, each gets read-only pheromones snapshot
+    and own random stream, deposits are merged by main process.
+    Results are reproducible for the same seed and number of workers.
+    """
 
     def __init__(
         self,
@@ -20,60 +34,141 @@ class ACO(AbstractSolver):
         growth_rate: float = 50.,
         residual_rate: float = 0.7,
         threshold: float = 0.01,
+        buckets: int = 16,
+        seed: Optional[int] = None,
+        workers: int = 1,
+        pool: str = 'process',
     ):
+        if pool not in ('thread', 'process'):
+            raise ValueError(f"Unknown pool type {pool}.")
         self.ants_n = ants_n
         self.max_iter = max_iter
-        self.pheromones = None
+        self.pheromones: np.ndarray = np.empty((0, 0, buckets))
         self.growth_r = growth_rate
         self.residual_r = residual_rate
         self.threshold = threshold
+        self.buckets = buckets
+        self.seed = seed
+        self.workers = workers
+        self.pool = pool
 
-    def _reset_pheromones(self):
-        self.pheromones = defaultdict(ACO._default_pheromone)
+    def _reset_pheromones(self, n: int, m: int):
+        self.pheromones = np.full((n, m, self.buckets), ACO._default_pheromone())
 
     @staticmethod
     def _default_pheromone():
         return 0.1
 
-    def solve(self, data: Instance_T, m: int) -> PartialSolution:
-        self._reset_pheromones()
-        best_ps = RandomSolver().solve(data, m)
-        for ii in range(self.max_iter):
-            if (ii + 1) % 10 == 0:
-                logger.info(f"Starting {ii + 1} ACO iteration.")
-
-            # run N Ants, each returns some solution
-            ants_result = [self._one_iteration(data, m) for _ in range(self.ants_n)]
-            # update all pheromones (evaporation)
-            self.pheromones = defaultdict(
-                ACO._default_pheromone,
-                (
-                    (k, v * self.residual_r)
-                    for k, v in self.pheromones.items()
-                    if v * self.residual_r >= self.threshold
-                )
-            )
-            # update pheromones according to solutions
-            for ps in ants_result:
-                _of = ps.abs_error
-                _sums = np.zeros(ps.m)
-                for i, x in enumerate(data):
-                    self.pheromones[(ps.get_sum_hash(_sums), i, ps.find_item(i))] += self.growth_r / _of
-                    _sums[ps.find_item(i)] += ps.cost[i]
-                if ps.abs_error < best_ps.abs_error:
-                    best_ps = ps
-
-        return best_ps
-
-    def _one_iteration(self, data: Instance_T, m: int) -> PartialSolution:
-        ps = PartialSolution(data, m=m)
-        for i, x in enumerate(data):
-            # choose where to put i by pheromones
-            phero = np.array([self.pheromones[(ps.sums_hash, i, j)] for j in range(m)])
-            j = np.random.choice(
-                list(range(m)),
-                1,
-                p=(phero / sum(phero)),
-            )[0]
-            ps.put_item(i, j)
-        return ps
+    def _executor(self) -> Optional[Executor]:
+        if self.workers <= 1:
+            return None
+        if self.pool == 'thread':
+            return ThreadPoolExecutor(max_workers=self.workers)
+        return ProcessPoolExecutor(max_workers=self.workers)
+
+    def iter_solve(self, data: Instance_T, m: int, budget: Optional[Budget] = None) -> Iterator[PartialSolution]:
+        recorder = self.recorder
+        data = Instance.create(data, m)
+        self._reset_pheromones(data.n, m)
+        rng = np.random.default_rng(self.seed)
+        # random start is drawn from the same generator, so runs are reproducible
+        best_ps = PartialSolution.from_partitioning(data, m, rng.integers(0, m, data.n))
+        recorder.objective(best_ps.squared_error)
+        yield best_ps
+        if budget is not None and budget.improved(best_ps):
+            return
+
+        executor = self._executor()
+        try:
+            for ii in range(self.max_iter):
+                if budget is not None and budget.tick():
+                    break
+                if (ii + 1) % 10 == 0:
+                    logger.info(f"Starting {ii + 1} ACO iteration.")
+
+                # run N Ants, each returns some solution
+                with recorder.phase('construction'):
+                    labels, buckets, sums = self._one_iteration(data, m, self.ants_n, rng, executor)
+                recorder.count('moves_proposed', self.ants_n)
+                with recorder.phase('evaluation'):
+                    errors = np.abs(m * sums - data.total).sum(axis=1) / m
+                recorder.count('objective_evaluations', self.ants_n)
+                with recorder.phase('pheromones'):
+                    # update all pheromones (evaporation)
+                    self.pheromones *= self.residual_r
+                    self.pheromones[self.pheromones < self.threshold] = ACO._default_pheromone()
+                    # update pheromones according to solutions, perfect ants deposit as the best imperfect ones
+                    deposits = self.growth_r / np.maximum(errors, 1. / m)
+                    items = np.broadcast_to(np.arange(data.n), labels.shape)
+                    np.add.at(self.pheromones, (items, labels, buckets), deposits[:, None])
+
+                k = int(np.argmin(errors))
+                if errors[k] < best_ps.abs_error:
+                    recorder.count('moves_accepted')
+                    best_ps = PartialSolution.from_partitioning(data, m, labels[k])
+                    recorder.objective(best_ps.squared_error)
+                    yield best_ps
+                    if budget is not None and budget.improved(best_ps):
+                        return
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    def _one_iteration(self, data: Instance, m: int, ants_n: int, rng: np.random.Generator,
+                       executor: Optional[Executor] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Builds ants_n solutions, split between executor workers if given.
+        Returns sets of items, buckets of chosen sets and sums of sets for each ant.
+        """
+        log_pheromones = np.log(self.pheromones)
+        if executor is None:
+            return _build_ants(data, m, ants_n, log_pheromones, rng)
+
+        sizes = [len(chunk) for chunk in np.array_split(np.arange(ants_n), self.workers) if len(chunk)]
+        seeds = rng.integers(2 ** 63, size=len(sizes)).tolist()
+        futures = [
+            executor.submit(_build_ants, data, m, size, log_pheromones, np.random.default_rng(seed))
+            for size, seed in zip(sizes, seeds)
+        ]
+        labels, buckets, sums = zip(*(future.result() for future in futures))
+        return np.concatenate(labels), np.concatenate(buckets), np.concatenate(sums)
+
+
+def _build_ants(data: Instance, m: int, ants_n: int, log_pheromones: np.ndarray,
+                rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Builds ants_n solutions at once by read-only log pheromones.
+    Returns sets of items, buckets of chosen sets and sums of sets for each ant.
+    """
+    top, negative = log_pheromones.shape[2] - 1, data.min < 0
+    sets, rows = np.arange(m), np.arange(ants_n) * m
+    sums = np.zeros((ants_n, m), dtype=np.int64)
+    flat_sums = sums.ravel()
+    # mean load of sets before each item, bucket of mean load is the middle one
+    means = np.abs(np.concatenate(([0], np.cumsum(data.values)[:-1])) / m)
+    widths = np.maximum(np.round(means * 2 / (top + 1)), 1).astype(np.int64)
+    # sampling proportional to pheromones by Gumbel-max trick, noise is drawn for chunk of items at once
+    chunk = max(1, _NOISE_CHUNK // (ants_n * m))
+    labels = np.empty((data.n, ants_n), dtype=PartialSolution.partitioning_dtype(m))
+    for i, (x, width) in enumerate(zip(data.values.tolist(), widths.tolist())):
+        if i % chunk == 0:
+            noise = rng.gumbel(size=(min(chunk, data.n - i), ants_n, m))
+        # choose where to put i by pheromones
+        bucket = np.minimum(sums // width, top)
+        if negative:
+            np.maximum(bucket, 0, out=bucket)
+        j = (log_pheromones[i, sets, bucket] + noise[i % chunk]).argmax(axis=1)
+        flat_sums[rows + j] += x
+        labels[i] = j
+    labels = labels.T
+    return labels, _chosen_buckets(data.values, labels, widths, m, top), sums
+
+
+def _chosen_buckets(values: np.ndarray, labels: np.ndarray, widths: np.ndarray, m: int, top: int) -> np.ndarray:
+    """ Buckets of chosen sets restored from loads of sets before each item """
+    loads = np.zeros(labels.shape, dtype=np.int64)
+    for j in range(m):
+        mask = labels == j
+        placed = np.where(mask, values, 0)
+        loads[mask] = (np.cumsum(placed, axis=1) - placed)[mask]
+    return np.clip(loads // widths, 0, top)
@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Dict, Iterable, Optional, TextIO, Tuple, Union
+
+import numpy as np
+
+from core import AbstractSolver, AnytimeSolver, Budget, Instance, LocalSearch, SolverFactory
+
+
+logger = logging.getLogger(__name__)
+
+
+def _solve_instance(solver: AbstractSolver, path: str, instance: Instance, time_limit: Optional[float]) -> dict:
+    """ Solves one instance in worker process, returns its result record """
+    start = time.time()
+    if isinstance(solver, AnytimeSolver):
+        ps = solver.solve(instance, instance.m, Budget(time_limit=time_limit))
+    else:
+        ps = solver.solve(instance, instance.m)
+    return {
+        'path': path,
+        'n': instance.n,
+        'm': instance.m,
+        'squared_error': ps.squared_error,
+        'abs_error': ps.abs_error,
+        'sums': ps.sums.tolist(),
+        'partitioning': ps.partitioning.tolist(),
+        'time': time.time() - start,
+    }
+
+
+class BatchSolver:
+    """
+    Solves stream of (path, values) instances (e.g. GlobSource) in a process pool.
+    At most max_pending instances are submitted and not finished, so source
+    is consumed (and parsed in background) as fast as solver pool goes.
+    Results are written as json lines in order of finishing.
+
+    Solver is either stateless solver used for every instance or factory
+    building solver for each instance (needed for local searches, that
+    improve their own start solution). Instances that can't be solved
+    (or read: source yields (path, exception), see GlobSource errors='return')
+    get {'path', 'error'} records instead of stopping the batch.
+    """
+
+    def __init__(
+            self,
+            solver: Union[AbstractSolver, SolverFactory],
+            m: int,
+            processes: Optional[int] = None,
+            max_pending: Optional[int] = None,
+            time_limit: Optional[float] = None,
+    ):
+        if isinstance(solver, LocalSearch):
+            raise ValueError("Local search solves its own start solution, pass factory building it per instance.")
+        self.solver = solver
+        self.m = m
+        self.processes = processes
+        self.max_pending = max_pending
+        self.time_limit = time_limit
+
+    def _build(self, instance: Instance) -> AbstractSolver:
+        if isinstance(self.solver, AbstractSolver):
+            return self.solver
+        return self.solver(instance, self.m)
+
+    def run(self, source: Iterable[Tuple[str, Union[np.ndarray, Exception]]], output: TextIO) -> int:
+        """ Solves all instances of source, returns number of solved ones """
+        solved = failed = 0
+        max_pending = self.max_pending or 2 * (self.processes or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=self.processes) as pool:
+            # future -> path of its instance
+            pending: Dict[Future, str] = {}
+            for path, values in source:
+                if len(pending) >= max_pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    solved, failed = self._write(done, pending, output, solved, failed)
+                try:
+                    if isinstance(values, Exception):
+                        # source could not read the instance
+                        raise values
+                    instance = Instance.create(values, self.m)
+                    pending[pool.submit(
+                        _solve_instance, self._build(instance), path, instance, self.time_limit,
+                    )] = path
+                except Exception as e:
+                    self._write_error(path, e, output)
+                    failed += 1
+            solved, failed = self._write(wait(pending).done, pending, output, solved, failed)
+        logger.info(f"Batch solved {solved} instances, {failed} failed.")
+        return solved
+
+    def _write(self, done: set, pending: dict, output: TextIO, solved: int, failed: int) -> Tuple[int, int]:
+        """ Writes results of done futures and removes them from pending, returns updated counts """
+        for future in done:
+            path = pending.pop(future)
+            try:
+                output.write(json.dumps(future.result()) + '\n')
+                solved += 1
+            except Exception as e:
+                self._write_error(path, e, output)
+                failed += 1
+        output.flush()
+        return solved, failed
+
+    @staticmethod
+    def _write_error(path: str, error: Exception, output: TextIO) -> None:
+        logger.warning(f"Can't solve instance '{path}': {error!r}")
+        output.write(json.dumps({'path': path, 'error': repr(error)}) + '\n')
@@ -1,28 +1,189 @@
-from typing import List
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core import AbstractSolver, Instance, Instance_T, PartialSolution
+from .karmarkar_karp import KarmarkarKarp
+
+
+logger = logging.getLogger(__name__)
+
+
+def _subset_sums(data: Sequence[int], limit: int) -> int:
+    """
+    Bitset (python int) of subset sums of data not greater than limit:
+    i-th bit is set if some subset of data sums to i.
+    """
+    mask = (1 << (limit + 1)) - 1
+    reach = 1
+    for x in data:
+        if x <= limit:
+            reach |= (reach << x) & mask
+    return reach
+
+
+def _reverse_bits(bits: int, width: int) -> int:
+    """ Reverses order of lower `width` bits """
+    raw = np.frombuffer(bits.to_bytes((width + 7) // 8, 'little'), dtype=np.uint8)
+    flipped = np.unpackbits(raw, bitorder='little')[:width][::-1]
+    return int.from_bytes(np.packbits(flipped, bitorder='little').tobytes(), 'little')
+
+
+def _find_subset(data: Sequence[int], items: List[int], target: int) -> List[int]:
+    """
+    Indices of items with values summing to reachable target.
+
+    Divide and conquer: target is split between halves of items by
+    intersecting subset sums of the left half with reversed subset sums
+    of the right one. Memory is O(target) bits, time is about
+    twice of the forward pass.
+    """
+    if target == 0:
+        return []
+    if len(items) == 1:
+        return items
+
+    left, right = items[:len(items) // 2], items[len(items) // 2:]
+    common = _subset_sums([data[i] for i in left], target) \
+        & _reverse_bits(_subset_sums([data[i] for i in right], target), target + 1)
+    left_target = (common & -common).bit_length() - 1
+    return _find_subset(data, left, left_target) + _find_subset(data, right, target - left_target)
 
 
 def Dynamic2MNP(data: List[int]) -> bool:
     """
     Dynamic programming algorithm to determine if
     there is a perfect partitioning of numbers in
-    two sets.
+    two sets. Reachable sums are kept as bitset,
+    each number is added by one shift-or.
 
-    time complexity: O(S * N)
-    memory complexity: O(S)
-    where S = sum(data), N = len(data)
+    time complexity: O(S * N / w)
+    memory complexity: O(S) bits
+    where S = sum(data), N = len(data), w - machine word size
     """
     s = sum(data)
     if s % 2 == 1:
         return False
 
     perfect = s // 2
-    arr = [0] * (perfect + 1)
-    arr[0] = 1
-    for x in data:
-        for i in range(perfect, x - 1, -1):
-            arr[i] = max([arr[i], arr[i - x]])
+    return bool((_subset_sums(data, perfect) >> perfect) & 1)
+
+
+class Dynamic2Solver(AbstractSolver):
+    """
+    Exact solver of 2-way MNP by bitset subset sum:
+    first set gets the largest reachable sum not greater than S / 2.
+    Numbers must be non-negative.
+    """
+    deterministic = True
+
+    def solve(self, data: Instance_T, m: int = 2) -> PartialSolution:
+        if m != 2:
+            raise ValueError("Dynamic2Solver solves only 2-way partitioning.")
+
+        instance = Instance.create(data, m)
+        if instance.min < 0:
+            raise ValueError("Dynamic2Solver works only with non-negative numbers.")
+
+        values = instance.values.tolist()
+        target = _subset_sums(values, instance.total // 2).bit_length() - 1
+        partitioning = np.ones(instance.n, dtype=PartialSolution.partitioning_dtype(m))
+        partitioning[_find_subset(values, list(range(instance.n)), target)] = 0
+        return PartialSolution.from_partitioning(instance, m, partitioning)
+
+
+class DynamicSolver(AbstractSolver):
+    """
+    Exact pseudo-polynomial solver of m-way MNP.
+
+    Items are added in decreasing order, a state is a sorted tuple of
+    the m - 1 smallest set sums (the largest one follows from the prefix sum),
+    so states equal up to sets permutation are merged, and among equal sums
+    only the first set gets an item. States which can not beat
+    Karmarkar-Karp solution by squared error are pruned.
+    If more than `max_states` states are stored,
+    Karmarkar-Karp solution is returned.
+    Numbers must be non-negative.
+    """
+    deterministic = True
+
+    def __init__(self, max_states: int = 10 ** 6):
+        self.max_states = max_states
+
+    def solve(self, data: Instance_T, m: int) -> PartialSolution:
+        instance = Instance.create(data, m)
+        if instance.min < 0:
+            raise ValueError("DynamicSolver works only with non-negative numbers.")
+
+        incumbent = KarmarkarKarp().solve(instance, m)
+        if m == 1 or incumbent.squared_error <= instance.perfect_squared_error:
+            return incumbent
+
+        total = instance.total
+        # squared error of incumbent scaled by m^2
+        bound = sum((m * s - total) ** 2 for s in incumbent.sums.tolist())
+        values, order = instance.values.tolist(), instance.order.tolist()
+
+        layer: Dict[Tuple[int, ...], Optional[Tuple[Tuple[int, ...], int]]] = {(0,) * (m - 1): None}
+        parents = []
+        prefix, remaining, stored = 0, total, 1
+        for i in order:
+            x = values[i]
+            remaining -= x
+            next_layer: Dict[Tuple[int, ...], Optional[Tuple[Tuple[int, ...], int]]] = {}
+            for key in layer:
+                full = key + (prefix - sum(key),)
+                for j, s in enumerate(full):
+                    if j and s == full[j - 1]:
+                        continue
+                    sums = sorted(full[:j] + (s + x,) + full[j + 1:])
+                    # lower bound on scaled squared error by the largest and the smallest set
+                    dev = max(m * sums[-1] - total, total - m * (sums[0] + remaining), 0)
+                    if dev * dev * m >= bound * (m - 1):
+                        continue
+                    next_key = tuple(sums[:-1])
+                    if next_key not in next_layer:
+                        next_layer[next_key] = (key, j)
+            prefix += x
+
+            if not next_layer:
+                return incumbent
+            stored += len(next_layer)
+            if stored > self.max_states:
+                logger.warning(f"DynamicSolver exceeded {self.max_states} states, Karmarkar-Karp solution returned.")
+                return incumbent
+            parents.append(next_layer)
+            layer = next_layer
+
+        best = min(layer, key=lambda key: self._scaled_error(key, total, m))
+        if self._scaled_error(best, total, m) >= bound:
+            return incumbent
+        return self._restore(instance, m, order, values, parents, best)
+
+    @staticmethod
+    def _scaled_error(key: Tuple[int, ...], total: int, m: int) -> int:
+        return sum((m * s - total) ** 2 for s in key + (total - sum(key),))
+
+    @staticmethod
+    def _restore(instance: Instance, m: int, order: List[int], values: List[int], parents: List[dict],
+                 key: Tuple[int, ...]) -> PartialSolution:
+        """ Walks parent pointers back and replays transitions on real sets """
+        path = []
+        for layer in reversed(parents):
+            key, j = layer[key]
+            path.append((key, j))
 
-    return arr[-1] == 1
+        sums = [0] * m
+        partitioning = np.empty(instance.n, dtype=PartialSolution.partitioning_dtype(m))
+        prefix = 0
+        for i, (key, j) in zip(order, reversed(path)):
+            full = key + (prefix - sum(key),)
+            k = sums.index(full[j])
+            sums[k] += values[i]
+            partitioning[i] = k
+            prefix += values[i]
+        return PartialSolution.from_partitioning(instance, m, partitioning)
 
 
 if __name__ == '__main__':
@@ -33,3 +194,5 @@ if __name__ == '__main__':
     print(Dynamic2MNP([1, 2, 3, 4, 5, 6, 7, 8]))
     print(Dynamic2MNP(list(range(0, 201))))
     print(Dynamic2MNP(list(range(0, 202))))
+    print(Dynamic2Solver().solve([1, 3, 5, 1, 7]).solution)
+    print(DynamicSolver().solve([4, 5, 6, 7, 8, 9, 11], 3).solution)
@@ -1,22 +1,31 @@
-from typing import Optional
+from typing import Iterator, Optional
 
 import gurobipy as grp
 
 from gurobipy import GRB
 
-from core import Instance_T, AbstractSolver, PartialSolution
+from core import Instance_T, AnytimeSolver, Budget, PartialSolution
 
 
-class GurobiSolver(AbstractSolver):
-    """ Uses Gurobi optimizer to solve MNP problem. """
-    def __init__(self, timelimit: Optional[int] = 300):
+class GurobiSolver(AnytimeSolver):
+    """
+    Uses Gurobi optimizer to solve MNP problem.
+    Budget deadline tightens time limit, budget callback
+    receives every new MIP incumbent and can terminate optimization.
+    """
+    deterministic = True
+
+    def __init__(self, timelimit: Optional[float] = 300):
         self.timelimit = timelimit
 
-    def solve(self, data: Instance_T, m: int) -> PartialSolution:
+    def iter_solve(self, data: Instance_T, m: int, budget: Optional[Budget] = None) -> Iterator[PartialSolution]:
         model = grp.Model("ip")
 
-        if self.timelimit:
-            model.setParam('TimeLimit', self.timelimit)
+        timelimit = self.timelimit
+        if budget is not None and budget.remaining is not None:
+            timelimit = budget.remaining if timelimit is None else min(timelimit, budget.remaining)
+        if timelimit is not None:
+            model.setParam('TimeLimit', timelimit)
 
         n = len(data)
         _perfect = PartialSolution.get_perfect(data, m)
@@ -40,11 +49,26 @@ class GurobiSolver(AbstractSolver):
             ]),
             GRB.MINIMIZE
         )
-        model.optimize()
 
-        sets = [
-            [elem for i, elem in enumerate(data) if _vars[i, j].x == 1]
-            for j in range(m)
-        ]
+        def _to_solution(values) -> PartialSolution:
+            return PartialSolution.from_solution([
+                [elem for i, elem in enumerate(data) if values[i, j] > 0.5]
+                for j in range(m)
+            ])
+
+        best_of = [float('inf')]
+
+        def _on_incumbent(cb_model, where) -> None:
+            if where == GRB.Callback.MIPSOL and cb_model.cbGet(GRB.Callback.MIPSOL_OBJ) < best_of[0]:
+                best_of[0] = cb_model.cbGet(GRB.Callback.MIPSOL_OBJ)
+                assert budget is not None
+                budget.tick()
+                if budget.improved(_to_solution(cb_model.cbGetSolution(_vars))):
+                    cb_model.terminate()
+
+        if budget is not None and budget.callback is not None:
+            model.optimize(_on_incumbent)
+        else:
+            model.optimize()
 
-        return PartialSolution.from_solution(sets)
+        yield _to_solution(model.getAttr('X', _vars))
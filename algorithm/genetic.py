@@ -1,13 +1,17 @@
 import copy
 import logging
+import multiprocessing
+import queue
 import random
+import time
+import traceback
 from abc import ABCMeta, abstractmethod
-from typing import List
+from typing import Dict, Iterator, List, Optional
 
-from more_itertools import flatten
+import numpy as np
 
 from core import (
-    AbstractMover, PartialSolution, AbstractSolver, Instance_T,
+    AbstractMover, PartialSolution, AnytimeSolver, Budget, Instance_T, Instance,
 )
 from .random_solution import RandomSolver
 
@@ -36,7 +40,7 @@ def _get_error(ps: PartialSolution):
     return ps.abs_error
 
 
-class GeneticAlgorithm(AbstractSolver):
+class GeneticAlgorithm(AnytimeSolver):
 
     def __init__(
             self,
@@ -62,10 +66,34 @@ class GeneticAlgorithm(AbstractSolver):
         self.elite_n = elite_n
         self.selection_n = selection_n
 
-    def solve(self, data: Instance_T, m: int) -> PartialSolution:
-        return min(self._genetic_run(data, m, self.max_iter), key=_get_error)
+    def iter_solve(self, data: Instance_T, m: int, budget: Optional[Budget] = None) -> Iterator[PartialSolution]:
+        data = Instance.create(data, m)
+        population = self._genetic_run(data, m, 0)
+        best_ps = min(population, key=_get_error)
+        self.recorder.objective(best_ps.squared_error)
+        yield best_ps
+        if budget is not None and budget.improved(best_ps):
+            return
+
+        for ii in range(self.max_iter):
+            if budget is not None and budget.tick():
+                break
+            if (ii + 1) % 10 == 0:
+                logger.info(f"Starting {ii + 1} GA iteration.")
+
+            population = self._genetic_run(data, m, 1, population=population)
+            ps = min(population, key=_get_error)
+            if ps.abs_error < best_ps.abs_error:
+                best_ps = ps
+                self.recorder.objective(best_ps.squared_error)
+                yield best_ps
+                if budget is not None and budget.improved(best_ps):
+                    break
 
     def _genetic_run(self, data, m, iter_n: int = 1, population=None):
+        recorder = self.recorder
+        if population is None:
+            data = Instance.create(data, m)
         population: List[PartialSolution] = population or [
             RandomSolver().solve(data, m)
             for _ in range(self.population_size)
@@ -76,21 +104,26 @@ class GeneticAlgorithm(AbstractSolver):
 
             # Selection (K best, T worst)
             K, T = int(self.selection_n * 0.9), int(self.selection_n * 0.1)
-            population.sort(key=_get_error)
-            population = population[:K] + population[-T:]
+            with recorder.phase('selection'):
+                population.sort(key=_get_error)
+                population = population[:K] + population[-T:]
+            recorder.count('objective_evaluations', len(population))
 
             # Recombination
-            mutations = [
-                self.mutation.move(copy.deepcopy(random.choice(population)))
-                for _ in range(self.mutations_n)
-            ]
-            crossovers = [
-                self.crossover.cross(
-                    random.choice(population),
-                    random.choice(population),
-                )
-                for _ in range(self.crossover_n)
-            ]
+            with recorder.phase('recombination'):
+                mutations = [
+                    self.mutation.move(copy.deepcopy(random.choice(population)))
+                    for _ in range(self.mutations_n)
+                ]
+                crossovers = [
+                    self.crossover.cross(
+                        random.choice(population),
+                        random.choice(population),
+                    )
+                    for _ in range(self.crossover_n)
+                ]
+            recorder.count('moves_proposed', self.mutations_n + self.crossover_n)
+            recorder.count('deep_copies', self.mutations_n + self.crossover_n)
 
             # New Population
             population = population[:self.elite_n] \
@@ -102,27 +135,309 @@ class GeneticAlgorithm(AbstractSolver):
 
 
 class ParallelGenetic(GeneticAlgorithm):
+    """
+    Island model of GeneticAlgorithm: each of `experiments_n` islands evolves
+    own population in a separate process. Every `migration_interval` generations
+    each island sends its best `part_to_share` of population (as assignment arrays)
+    to neighbours defined by topology ('ring' or 'full').
+    Island k seeds its random generators with `seed + k`.
+    After budget deadline islands stop evolving and only finish migrations,
+    the best solution is reported once all islands are done.
+    Error in any island is raised as RuntimeError and stops all islands.
+    """
+
+    _topologies = ('ring', 'full')
+    # seconds between checks that islands without results are still alive
+    _poll_interval = 1.
 
-    def __init__(self, *args, part_to_share=0.1, experiments_n=2, **kwargs):
+    def __init__(
+            self,
+            *args,
+            part_to_share=0.1,
+            experiments_n=2,
+            migration_interval: int = 1,
+            topology: str = 'ring',
+            seed: Optional[int] = None,
+            **kwargs,
+    ):
         super(ParallelGenetic, self).__init__(*args, **kwargs)
+        if topology not in self._topologies:
+            raise ValueError(f"Unknown topology '{topology}', expected one of {self._topologies}.")
+        if migration_interval < 1:
+            raise ValueError(f"Migration interval must be positive, got {migration_interval}.")
         self.part_to_share = part_to_share
         self.experiments_n = experiments_n
+        self.migration_interval = migration_interval
+        self.topology = topology
+        self.seed = seed
 
-    def solve(self, data: Instance_T, m: int) -> PartialSolution:
-        _populations = [self._genetic_run(data, m, 0) for _ in range(self.experiments_n)]
-        for ii in range(self.max_iter):
-            if (ii + 1) % 5 == 0:
-                logger.info(f"Starting {ii + 1} Parallel GA iteration.")
-
-            # mix
-            all_pop = list(flatten(_populations))
-            sz = len(_populations[0])
-            for p in _populations:
-                p.extend(random.sample(all_pop, int(sz * self.part_to_share)))
-            # genetic
-            _populations = [
-                self._genetic_run(None, None, 1, population=p)
-                for p in _populations
-            ]
-
-        return min(flatten(_populations), key=_get_error)
+    def _neighbours(self, k: int) -> List[int]:
+        """ Islands that k-th island sends migrants to """
+        if self.experiments_n == 1:
+            return []
+        if self.topology == 'ring':
+            return [(k + 1) % self.experiments_n]
+        return [t for t in range(self.experiments_n) if t != k]
+
+    def iter_solve(self, data: Instance_T, m: int, budget: Optional[Budget] = None) -> Iterator[PartialSolution]:
+        data = Instance.create(data, m)
+        deadline = None if budget is None else budget.deadline
+        ctx = multiprocessing.get_context()
+        inboxes = [ctx.Queue() for _ in range(self.experiments_n)]
+        results = ctx.Queue()
+        islands = [
+            ctx.Process(target=self._island, args=(k, data, m, inboxes, results, deadline), daemon=True)
+            for k in range(self.experiments_n)
+        ]
+        for island in islands:
+            island.start()
+        try:
+            best = self._collect(islands, results)
+        finally:
+            for island in islands:
+                if island.is_alive():
+                    island.terminate()
+                island.join()
+
+        best_ps = min(
+            (PartialSolution.from_partitioning(data, m, partitioning) for partitioning in best),
+            key=_get_error,
+        )
+        if budget is not None:
+            budget.tick()
+            budget.improved(best_ps)
+        yield best_ps
+
+    def _collect(self, islands: list, results) -> List[np.ndarray]:
+        """ Best partitionings of all islands by island number, raises if any island failed or died """
+        best: Dict[int, np.ndarray] = {}
+        while len(best) < len(islands):
+            # island dead before waiting has already flushed its result to the queue
+            alive = [island.is_alive() for island in islands]
+            try:
+                k, partitioning, error = results.get(timeout=self._poll_interval)
+            except queue.Empty:
+                for k, island in enumerate(islands):
+                    if not alive[k] and k not in best:
+                        raise RuntimeError(f"Island {k} exited with code {island.exitcode} without result.")
+                continue
+            if error is not None:
+                raise RuntimeError(f"Island {k} failed:\n{error}")
+            best[k] = partitioning
+        return [best[k] for k in range(len(islands))]
+
+    def _island(
+            self, k: int, data: Instance, m: int, inboxes: list, results, deadline: Optional[float],
+    ) -> None:
+        try:
+            results.put((k, self._evolve_island(k, data, m, inboxes, deadline), None))
+        except Exception:
+            logger.exception(f"Island {k} failed.")
+            results.put((k, None, traceback.format_exc()))
+
+    def _evolve_island(self, k: int, data: Instance, m: int, inboxes: list, deadline: Optional[float]) -> np.ndarray:
+        """ Evolves k-th island, returns the best partitioning """
+        seed = None if self.seed is None else self.seed + k
+        random.seed(seed)
+        np.random.seed(seed)
+        neighbours = self._neighbours(k)
+        senders_n = sum(k in self._neighbours(t) for t in range(self.experiments_n))
+
+        population = self._genetic_run(data, m, 0)
+        done = 0
+        while done < self.max_iter:
+            step = min(self.migration_interval, self.max_iter - done)
+            # islands keep migrating after deadline to not block neighbours
+            if deadline is None or time.time() < deadline:
+                population = self._genetic_run(data, m, step, population=population)
+            done += step
+            if done % 5 == 0:
+                logger.info(f"Island {k}: finished {done} Parallel GA iterations.")
+            if done == self.max_iter or not neighbours:
+                continue
+
+            # migration
+            population.sort(key=_get_error)
+            migrants_n = int(len(population) * self.part_to_share)
+            migrants = np.stack([ps.partitioning for ps in population[:migrants_n]]) \
+                if migrants_n else np.empty((0, data.n), dtype=PartialSolution.partitioning_dtype(m))
+            for t in neighbours:
+                inboxes[t].put((k, migrants))
+            received = sorted((inboxes[k].get() for _ in range(senders_n)), key=lambda x: x[0])
+            population.extend(
+                PartialSolution.from_partitioning(data, m, row)
+                for _, rows in received
+                for row in rows
+            )
+
+        return min(population, key=_get_error).partitioning
+
+
+class Population:
+    """
+    Population of MNP solutions stored as matrices.
+
+    Row k of `partitioning` (pop, n) holds set indices of k-th individual
+    (same compact dtype as PartialSolution.partitioning),
+    row k of `sums` (pop, m) holds its set sums.
+    """
+
+    # float64 accumulates integers exactly up to this bound
+    _exact_float_sum = 1 << 53
+
+    def __init__(self, instance: Instance, partitioning: np.ndarray, sums: Optional[np.ndarray] = None):
+        self.instance = instance
+        self.cost = instance.values
+        self.m = instance.m
+        self.perfect = instance.perfect
+        self.partitioning = partitioning
+        self.sums = self.calculate_sums(partitioning) if sums is None else sums
+
+    @staticmethod
+    def random(instance: Instance, size: int, rng: np.random.Generator) -> 'Population':
+        return Population(instance, rng.integers(
+            0, instance.m, size=(size, instance.n), dtype=PartialSolution.partitioning_dtype(instance.m),
+        ))
+
+    def __len__(self) -> int:
+        return len(self.partitioning)
+
+    def calculate_sums(self, partitioning: np.ndarray) -> np.ndarray:
+        pop_n = len(partitioning)
+        if int(np.abs(self.cost).sum()) < self._exact_float_sum:
+            idx = (np.arange(pop_n)[:, None] * self.m + partitioning).ravel()
+            weights = np.broadcast_to(self.cost, partitioning.shape).ravel()
+            flat = np.bincount(idx, weights=weights, minlength=pop_n * self.m)
+            return np.rint(flat).astype(np.int64).reshape(pop_n, self.m)
+
+        sums = np.empty((pop_n, self.m), dtype=np.int64)
+        for j in range(self.m):
+            sums[:, j] = (partitioning == j) @ self.cost
+        return sums
+
+    @property
+    def errors(self) -> np.ndarray:
+        """ Sum of absolute errors of every individual """
+        return np.abs(self.sums - self.perfect).sum(axis=1)
+
+    def take(self, idx: np.ndarray) -> 'Population':
+        return Population(self.instance, self.partitioning[idx], self.sums[idx])
+
+    def concat(self, *others: 'Population') -> 'Population':
+        return Population(
+            self.instance,
+            np.concatenate([self.partitioning] + [p.partitioning for p in others]),
+            np.concatenate([self.sums] + [p.sums for p in others]),
+        )
+
+    def half_cross(self, idx_1: np.ndarray, idx_2: np.ndarray) -> 'Population':
+        """ Vectorized HalfCrossover: first half of items from idx_1 rows, second from idx_2 rows """
+        h = self.partitioning.shape[1] // 2
+        children = self.partitioning[idx_1]
+        children[:, h:] = self.partitioning[idx_2, h:]
+        return Population(self.instance, children)
+
+    def mutate(self, idx: np.ndarray, mutation_size: int, rng: np.random.Generator) -> 'Population':
+        """ Copies idx rows and moves `mutation_size` random items of each to random sets """
+        mutants = self.take(idx)
+        rows = np.arange(len(idx))
+        for _ in range(mutation_size):
+            items = rng.integers(0, self.partitioning.shape[1], size=len(idx))
+            new_sets = rng.integers(0, self.m, size=len(idx), dtype=self.partitioning.dtype)
+            old_sets = mutants.partitioning[rows, items]
+            mutants.sums[rows, old_sets] -= self.cost[items]
+            mutants.sums[rows, new_sets] += self.cost[items]
+            mutants.partitioning[rows, items] = new_sets
+        return mutants
+
+    def to_solution(self, k: int) -> PartialSolution:
+        return PartialSolution.from_partitioning(self.instance, self.m, self.partitioning[k])
+
+
+class BatchGeneticAlgorithm(AnytimeSolver):
+    """
+    Genetic Algorithm that keeps whole population in one Population
+    and runs selection, crossover and mutation as array operations.
+    Scheme of generation is the same as in GeneticAlgorithm;
+    crossover is HalfCrossover, mutation moves random items to random sets.
+    """
+
+    def __init__(
+            self,
+            population_size: int = 1000,
+            max_iter: int = 1000,
+            mutations_n: int = 200,
+            crossover_n: int = 50,
+            old_livers_n: int = 25,
+            elite_n: int = 100,
+            selection_n: int = 100,
+            mutation_size: int = 1,
+            seed: Optional[int] = None,
+    ):
+        assert population_size >= selection_n
+        assert crossover_n + mutations_n + old_livers_n + elite_n >= selection_n
+        self.population_size = population_size
+        self.max_iter = max_iter
+        self.mutations_n = mutations_n
+        self.crossover_n = crossover_n
+        self.old_livers_n = old_livers_n
+        self.elite_n = elite_n
+        self.selection_n = selection_n
+        self.mutation_size = mutation_size
+        self.seed = seed
+
+    def iter_solve(self, data: Instance_T, m: int, budget: Optional[Budget] = None) -> Iterator[PartialSolution]:
+        rng = np.random.default_rng(self.seed)
+        population = Population.random(Instance.create(data, m), self.population_size, rng)
+        best_of = float('inf')
+        for ii in range(self.max_iter + 1):
+            if ii > 0:
+                if budget is not None and budget.tick():
+                    break
+                if ii % 10 == 0:
+                    logger.info(f"Starting {ii} batch GA iteration.")
+                population = self._genetic_run(population, 1, rng)
+
+            errors = population.errors
+            k = int(np.argmin(errors))
+            if errors[k] < best_of:
+                best_of = errors[k]
+                best_ps = population.to_solution(k)
+                self.recorder.objective(best_ps.squared_error)
+                yield best_ps
+                if budget is not None and budget.improved(best_ps):
+                    break
+
+    def _genetic_run(self, population: Population, iter_n: int, rng: np.random.Generator) -> Population:
+        recorder = self.recorder
+        for ii in range(iter_n):
+            if (ii + 1) % 10 == 0:
+                logger.info(f"Starting {ii + 1} batch GA iteration.")
+
+            # Selection (K best, T worst)
+            K, T = int(self.selection_n * 0.9), int(self.selection_n * 0.1)
+            with recorder.phase('selection'):
+                order = np.argsort(population.errors, kind='stable')
+                population = population.take(np.concatenate([order[:K], order[len(order) - T:]]))
+            recorder.count('objective_evaluations', len(order))
+
+            # Recombination
+            pop_n = len(population)
+            with recorder.phase('recombination'):
+                mutations = population.mutate(
+                    rng.integers(0, pop_n, size=self.mutations_n), self.mutation_size, rng,
+                )
+                crossovers = population.half_cross(
+                    rng.integers(0, pop_n, size=self.crossover_n),
+                    rng.integers(0, pop_n, size=self.crossover_n),
+                )
+            recorder.count('moves_proposed', self.mutations_n + self.crossover_n)
+
+            # New Population
+            population = population.take(np.arange(min(self.elite_n, pop_n))).concat(
+                population.take(rng.choice(pop_n, size=self.old_livers_n, replace=False)),
+                mutations,
+                crossovers,
+            )
+
+        return population
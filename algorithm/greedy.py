@@ -1,14 +1,50 @@
-from typing import cast
+from heapq import heapreplace
+from typing import Tuple
 
 import numpy as np
 
-from core import AbstractSolver, Instance_T, PartialSolution, Solution_T
+from core import AbstractSolver, Instance, Instance_T, PartialSolution
 
 
 class GreedySolver(AbstractSolver):
-    """ Greedy heuristics to solve MNP problem """
+    """
+    Greedy heuristics to solve MNP problem:
+    items by decreasing value (LPT) are put to the set with the least sum
+    """
+    deterministic = True
+
     def solve(self, data: Instance_T, m: int) -> PartialSolution:
-        ps = PartialSolution(data, m=m)
-        for value, idx in sorted(((x, idx) for idx, x in enumerate(data)), reverse=True):
-            ps.put_item(idx, cast(int, np.argmin(ps.sums)))
-        return ps
+        instance = Instance.create(data, m)
+        partitioning = np.empty(instance.n, dtype=PartialSolution.partitioning_dtype(m))
+        # (sum, set) heap pops the first of sets with the least sum, as np.argmin
+        heap = [(0, j) for j in range(m)]
+        for i, x in zip(instance.order.tolist(), instance.values[instance.order].tolist()):
+            s, j = heap[0]
+            heapreplace(heap, (s + x, j))
+            partitioning[i] = j
+        return PartialSolution.from_partitioning(instance, m, partitioning)
+
+    @staticmethod
+    def solve_many(values: np.ndarray, offsets: np.ndarray, m: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Greedy solutions of many instances at once, i-th instance is
+        values[offsets[i]:offsets[i + 1]]. All instances are solved in lockstep,
+        one item of every instance per step.
+        Returns sets of all values and (instances, m) array of set sums.
+        """
+        values = np.asarray(values, dtype=np.int64)
+        offsets = np.asarray(offsets, dtype=np.intp)
+        lengths = np.diff(offsets)
+        owners = np.repeat(np.arange(len(lengths)), lengths)
+        # by instance, then by decreasing value, equal values by decreasing index (as solve)
+        order = np.lexsort((np.arange(len(values)), values, -owners))[::-1]
+
+        partitioning = np.empty(len(values), dtype=PartialSolution.partitioning_dtype(m))
+        sums = np.zeros((len(lengths), m), dtype=np.int64)
+        for t in range(int(lengths.max()) if len(lengths) else 0):
+            active = np.flatnonzero(lengths > t)
+            items = order[offsets[active] + t]
+            sets = sums[active].argmin(axis=1)
+            partitioning[items] = sets
+            sums[active, sets] += values[items]
+        return partitioning, sums
@@ -1,19 +1,23 @@
 from __future__ import annotations
 
-from typing import List, Optional
-from heapq import heappop, heappush
+from array import array
+from collections import Counter
+from itertools import permutations
+from operator import add
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from heapq import heapify, heappop, heappush
 
 import numpy as np
 
-from core import Instance_T, Solution_T, AbstractSolver, PartialSolution
+from core import Instance, Instance_T, Solution_T, AbstractSolver, AnytimeSolver, Budget, PartialSolution
 
 
 class _PartialSet:
     def __init__(self, m: int = 2, first_element: Optional[int] = None):
         self.m = m
         self.sets: Solution_T = [[] for _ in range(m)]
-        self.errors: np.ndarray = np.zeros(m, dtype=int)
-        if first_element:
+        self.errors: List[int] = [0] * m
+        if first_element is not None:
             self.sets[-1].append(first_element)
             self.errors[-1] = first_element
 
@@ -21,6 +25,11 @@ class _PartialSet:
     def error(self) -> int:
         return sum(self.errors)
 
+    @property
+    def spread(self) -> int:
+        # difference between largest and smallest set
+        return max(self.errors) - min(self.errors)
+
     def _ground_errors(self) -> None:
         _m = min(self.errors)
         self.errors = [x - _m for x in self.errors]
@@ -43,6 +52,23 @@ class _PartialSet:
         self._reorder()
         return self
 
+    def combined_errors(self, other: _PartialSet, perm: Sequence[int]) -> List[int]:
+        """ Grounded sorted errors of self.combine(other, perm) """
+        errors = sorted(x + other.errors[p] for x, p in zip(self.errors, perm))
+        return [x - errors[0] for x in errors]
+
+    def combine(self, other: _PartialSet, perm: Sequence[int]) -> _PartialSet:
+        """ New PartialSet where k-th set of self is joined with perm[k]-th set of other """
+        if self.m != other.m:
+            raise ValueError("Wrong operands! Number of sets in operands is not equal.")
+
+        node = _PartialSet(m=self.m)
+        node.sets = [x + other.sets[p] for x, p in zip(self.sets, perm)]
+        node.errors = [x + other.errors[p] for x, p in zip(self.errors, perm)]
+        node._ground_errors()
+        node._reorder()
+        return node
+
     def __lt__(self, other: _PartialSet) -> bool:
         # for heapq lesser is one with greater error
         return self.error > other.error
@@ -59,24 +85,232 @@ class _PartialSet:
 
 
 class KarmarkarKarp(AbstractSolver):
-    """ Karmarkar-Karp Algorithm implementation """
+    """
+    Karmarkar-Karp Algorithm implementation.
+
+    Heap holds (-error, node id) pairs packed into ints, grounded errors
+    of alive nodes are tuples. Merge only records children of the new node
+    and order of its sets, so merges form union-find like parent pointers.
+    Items are labeled with final sets at the end by vectorized pointer
+    jumping to the root.
+    """
+    deterministic = True
+
     def __init__(self, *args, **kwargs):
         super(KarmarkarKarp, self).__init__(*args, **kwargs)
         self._solution = None
 
     def solve(self, data: Instance_T, m: int = 2) -> PartialSolution:
-        if len(data) == 0:
+        instance = Instance.create(data, m)
+        n = instance.n
+        if n == 0:
             return PartialSolution.from_solution([[] for _ in range(m)])
 
-        queue: List[_PartialSet] = []
-        for x in data:
-            heappush(queue, _PartialSet(m=m, first_element=x))
+        dtype = PartialSolution.partitioning_dtype(m)
+        # node i < n is i-th item with error in its last set, node n + t is t-th merge
+        errors: List[Optional[tuple]] = [(0,) * (m - 1) + (x,) for x in instance.values.tolist()]
+        # heap key packs (-error, node id) into one int: -error << shift | id
+        shift = (2 * n).bit_length()
+        mask = (1 << shift) - 1
+        queue = [(-x << shift) | i for i, x in enumerate(instance.values.tolist())]
+        heapify(queue)
+        # k-th set of (n + t)-th node is order[t][k]-th set of first child
+        # joined with (m - 1 - order[t][k])-th set of second child
+        orders = array('B' if dtype == np.uint8 else 'H')
+        first, second = [], []
+        c = n
 
         while len(queue) > 1:
-            heappush(queue, heappop(queue) | heappop(queue))
+            a = heappop(queue) & mask
+            b = heappop(queue) & mask
+            err_a, err_b = errors[a], errors[b]
+            errors[a] = errors[b] = None
+
+            merged = list(map(add, err_a, reversed(err_b)))
+            order = sorted(range(m), key=merged.__getitem__)
+            low = merged[order[0]]
+            err_c = tuple([merged[k] - low for k in order])
+
+            orders.extend(order)
+            first.append(a)
+            second.append(b)
+            errors.append(err_c)
+            heappush(queue, (-sum(err_c) << shift) | c)
+            c += 1
+
+        self._solution = PartialSolution.from_partitioning(
+            instance, m, self._label_items(n, m, first, second, np.frombuffer(orders, dtype=dtype)),
+        )
+        return self._solution
+
+    @staticmethod
+    def _label_items(n: int, m: int, first: List[int], second: List[int], orders: np.ndarray) -> np.ndarray:
+        """ Final set of every item by parent pointers of merge tree """
+        root = 2 * n - 2
+        merges = np.arange(n, root + 1)
+        # maps[v][k] - set of parent[v] that k-th set of v is merged to
+        position = np.argsort(orders.reshape(n - 1, m), axis=1).astype(orders.dtype)
+        parent = np.full(root + 1, root, dtype=np.int64)
+        maps = np.empty((root + 1, m), dtype=orders.dtype)
+        maps[root] = np.arange(m)
+        parent[first] = parent[second] = merges
+        maps[first] = position
+        maps[second] = position[:, ::-1]
+
+        while not np.all(parent == root):
+            maps = np.take_along_axis(maps[parent], maps, axis=1)
+            parent = parent[parent]
+        return maps[:n, -1]
+
+
+class _Frontier:
+    """
+    Not yet combined PartialSets of CKK search: heap by greater error
+    (equal errors by creation order, as in KarmarkarKarp), with sum of
+    spreads and lazily updated heap of spreads for the lower bound.
+    Push, pop and bound are O(log n), removal of a pushed node (backtracking) is O(n).
+    """
+
+    def __init__(self, nodes: List[_PartialSet]):
+        self.heap = [(-x.error, k, x) for k, x in enumerate(nodes)]
+        heapify(self.heap)
+        self.created = len(nodes)
+        self.spreads = [-x.spread for x in nodes]
+        heapify(self.spreads)
+        self.removed: Counter = Counter()
+        self.spreads_sum = sum(x.spread for x in nodes)
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def push(self, entry: tuple) -> None:
+        heappush(self.heap, entry)
+        heappush(self.spreads, -entry[2].spread)
+        self.spreads_sum += entry[2].spread
+
+    def push_node(self, node: _PartialSet) -> tuple:
+        entry = (-node.error, self.created, node)
+        self.created += 1
+        self.push(entry)
+        return entry
+
+    def pop(self) -> tuple:
+        entry = heappop(self.heap)
+        self._forget(entry[2])
+        return entry
+
+    def remove(self, entry: tuple) -> None:
+        heap = self.heap
+        i = heap.index(entry)
+        last = heap.pop()
+        if i < len(heap):
+            heap[i] = last
+            heapify(heap)
+        self._forget(entry[2])
+
+    def _forget(self, node: _PartialSet) -> None:
+        self.removed[node.spread] += 1
+        self.spreads_sum -= node.spread
+
+    def lower_bound(self) -> int:
+        """ Max spread minus sum of other spreads """
+        while self.removed[-self.spreads[0]]:
+            self.removed[-heappop(self.spreads)] -= 1
+        return -2 * self.spreads[0] - self.spreads_sum
+
+
+class CompleteKarmarkarKarp(AnytimeSolver):
+    """
+    Complete Karmarkar-Karp (CKK) branch and bound for m-way partitioning.
+
+    Depth-first search over all m! ways to combine two PartialSets with
+    the largest errors, the first branch is the Karmarkar-Karp one,
+    so the first solution found equals KarmarkarKarp result.
+    Minimizes difference between largest and smallest set sums;
+    branch is pruned when max spread minus sum of other spreads can't
+    beat the incumbent, search stops on perfect partition.
+
+    All branches share one _Frontier: descending pops two nodes and pushes
+    their combination, backtracking reverts it, so the first (KK) path
+    costs O(n log n).
+    """
+    deterministic = True
+
+    def __init__(self, *args, **kwargs):
+        super(CompleteKarmarkarKarp, self).__init__(*args, **kwargs)
+        self._solution = None
+
+    @staticmethod
+    def _label_items(instance: Instance, sets: Solution_T) -> np.ndarray:
+        """ Sets of items in input order, items with equal values are interchangeable """
+        indices: Dict[int, List[int]] = {}
+        for i, x in enumerate(instance.values.tolist()):
+            indices.setdefault(x, []).append(i)
+        partitioning = np.empty(instance.n, dtype=PartialSolution.partitioning_dtype(instance.m))
+        for j, values in enumerate(sets):
+            for x in values:
+                partitioning[indices[x].pop()] = j
+        return partitioning
+
+    @staticmethod
+    def _branches(first: _PartialSet, second: _PartialSet) -> Iterator[Tuple[int, ...]]:
+        """ Permutations to combine first and second by, KK one first """
+        m = first.m
+        kk_perm = tuple(reversed(range(m)))
+        branches: Dict[Tuple[int, ...], Tuple[int, ...]] = {}
+        for perm in [kk_perm] + [p for p in permutations(range(m)) if p != kk_perm]:
+            # permutations giving equal errors lead to equivalent subtrees
+            branches.setdefault(tuple(first.combined_errors(second, perm)), perm)
+        for errors, perm in sorted(branches.items(), key=lambda x: (x[1] != kk_perm, x[0][-1])):
+            yield perm
+
+    @staticmethod
+    def _advance(frontier: _Frontier, stack: list) -> bool:
+        """ Replaces the last combination with the next branch, returns False when search is over """
+        while stack:
+            frame = stack[-1]
+            first, second, branches, child = frame
+            if child is not None:
+                frontier.remove(child)
+            perm = next(branches, None)
+            if perm is None:
+                stack.pop()
+                frontier.push(first)
+                frontier.push(second)
+                continue
+            frame[3] = frontier.push_node(first[2].combine(second[2], perm))
+            return True
+        return False
+
+    def iter_solve(self, data: Instance_T, m: int = 2, budget: Optional[Budget] = None) -> Iterator[PartialSolution]:
+        if len(data) == 0:
+            yield PartialSolution.from_solution([[] for _ in range(m)])
+            return
+
+        instance = Instance.create(data, m)
+        perfect_spread = 0 if instance.total % m == 0 else 1
+        best_spread = None
+        frontier = _Frontier([_PartialSet(m=m, first_element=x) for x in instance.values.tolist()])
+        # frames are [first entry, second entry, branches, entry of current combination]
+        stack = []
+        while True:
+            if budget is not None and budget.tick():
+                break
 
-        self._solution = queue[0]
-        return PartialSolution.from_solution(self._solution.sets)
+            if len(frontier) == 1:
+                node = frontier.heap[0][2]
+                if best_spread is None or node.spread < best_spread:
+                    best_spread = node.spread
+                    self._solution = node
+                    ps = PartialSolution.from_partitioning(instance, m, self._label_items(instance, node.sets))
+                    yield ps
+                    if best_spread <= perfect_spread or (budget is not None and budget.improved(ps)):
+                        break
+            elif best_spread is None or max(frontier.lower_bound(), perfect_spread) < best_spread:
+                first, second = frontier.pop(), frontier.pop()
+                stack.append([first, second, self._branches(first[2], second[2]), None])
+            if not self._advance(frontier, stack):
+                break
 
 
 if __name__ == '__main__':
@@ -0,0 +1,191 @@
+import logging
+import multiprocessing
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from core import (
+    AbstractSolver, AnytimeSolver, Budget, Instance, Instance_T, LocalSearch, PartialSolution,
+)
+from .random_solution import RandomSolver
+
+
+logger = logging.getLogger(__name__)
+
+
+# Best squared error found by any worker of the pool and flag set once portfolio stopped,
+# both are set by _init_worker
+_incumbent: Any = None
+_stop: Any = None
+
+
+def _init_worker(incumbent, stop) -> None:
+    global _incumbent, _stop
+    _incumbent = incumbent
+    _stop = stop
+
+
+class _WorkerBudget(Budget):
+    """ Budget of worker run, also stops once portfolio is stopped """
+
+    def tick(self) -> bool:
+        if _stop is not None and _stop.value:
+            self.stopped = True
+        return super().tick()
+
+
+def _share_incumbent(ps: PartialSolution) -> bool:
+    """ Budget callback: publishes incumbent, stops once any worker found perfect one """
+    of = ps.squared_error
+    with _incumbent.get_lock():
+        if of < _incumbent.value:
+            _incumbent.value = of
+        return _incumbent.value <= ps.instance.perfect_squared_error
+
+
+def _run_restart(
+        solver: AbstractSolver,
+        data: Instance,
+        m: int,
+        restart: int,
+        seed: int,
+        deadline: Optional[float],
+) -> Optional[tuple]:
+    """
+    Runs one restart of solver in worker process.
+    Returns (solution, squared error, elapsed time)
+    or None if run was skipped because of deadline, stop or perfect incumbent.
+    """
+    if deadline is not None and time.time() >= deadline:
+        return None
+    if _stop is not None and _stop.value:
+        return None
+    if _incumbent is not None and _incumbent.value <= data.perfect_squared_error:
+        return None
+
+    random.seed(seed)
+    np.random.seed(seed)
+    if isinstance(solver, LocalSearch) and restart > 0:
+        solver = solver.restarted(RandomSolver().solve(data, m))
+    if hasattr(solver, 'seed'):
+        # solver is the worker's own copy, so its seed is set in place
+        setattr(solver, 'seed', seed)
+
+    start = time.time()
+    if isinstance(solver, AnytimeSolver):
+        ps = solver.solve(data, m, _WorkerBudget(deadline=deadline, callback=_share_incumbent))
+    else:
+        ps = solver.solve(data, m)
+        _share_incumbent(ps)
+    elapsed = time.time() - start
+    return ps, ps.squared_error, elapsed
+
+
+class PortfolioSolver(AnytimeSolver):
+    """
+    Runs every solver of portfolio `restarts` times (deterministic ones once)
+    in a process pool and returns the best solution by squared error.
+
+    Workers share the best found squared error and stop once it is perfect.
+    Anytime solvers stop on the deadline of `time_limit` (or of budget) and
+    once portfolio is stopped, runs not finished by then are dropped.
+    Every restart gets its own seed derived from `seed`, it is set to
+    solvers having `seed` attribute as well as to global random generators.
+    Statistics of the last solve per solver are kept in `stats`.
+    """
+
+    def __init__(
+            self,
+            solvers: Iterable[AbstractSolver],
+            restarts: int = 1,
+            processes: Optional[int] = None,
+            time_limit: Optional[float] = None,
+            seed: Optional[int] = None,
+    ):
+        self.solvers: List[AbstractSolver] = list(solvers)
+        self.restarts = restarts
+        self.processes = processes
+        self.time_limit = time_limit
+        self.seed = seed
+        self.stats: Dict[str, dict] = {}
+
+    def _names(self) -> List[str]:
+        names = [type(solver).__name__ for solver in self.solvers]
+        return [
+            f"{name}_{k}" if names.count(name) > 1 else name
+            for k, name in enumerate(names)
+        ]
+
+    def iter_solve(self, data: Instance_T, m: int, budget: Optional[Budget] = None) -> Iterator[PartialSolution]:
+        data = Instance.create(data, m)
+        deadline = Budget(time_limit=self.time_limit, deadline=None if budget is None else budget.deadline).deadline
+        names = self._names()
+        self.stats = {
+            name: {'runs': 0, 'skipped': 0, 'best': float('inf'), 'mean': None, 'time': 0.}
+            for name in names
+        }
+
+        ctx = multiprocessing.get_context()
+        incumbent = ctx.Value('d', float('inf'))
+        stop = ctx.Value('b', False)
+        pool = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(incumbent, stop),
+        )
+        base_seed = random.getrandbits(32) if self.seed is None else self.seed
+        futures: Dict[Future, str] = {}
+        for k, solver in enumerate(self.solvers):
+            for r in range(1 if solver.deterministic else self.restarts):
+                seed = base_seed + len(futures)
+                future = pool.submit(_run_restart, solver, data, m, r, seed, deadline)
+                futures[future] = names[k]
+
+        best_of = float('inf')
+        objectives: Dict[str, List[float]] = {name: [] for name in names}
+        pending = set(futures)
+        try:
+            while pending:
+                timeout = None if deadline is None else max(0., deadline - time.time())
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    logger.info(f"Portfolio time limit reached, dropping {len(pending)} runs.")
+                    break
+                stop = False
+                for future in done:
+                    name, result = futures[future], future.result()
+                    if result is None:
+                        self.stats[name]['skipped'] += 1
+                        continue
+                    ps, of, elapsed = result
+                    objectives[name].append(of)
+                    self.stats[name]['time'] += elapsed
+                    if of < best_of:
+                        best_of = of
+                        logger.info(f"New portfolio incumbent {of} by {name}.")
+                        yield ps
+                        stop = stop or (budget is not None and budget.improved(ps))
+                if stop or (budget is not None and budget.tick()):
+                    break
+        finally:
+            # running anytime solvers see the flag on their next tick
+            stop.value = True
+            for future in pending:
+                future.cancel()
+            pool.shutdown(wait=True)
+            self._gather_stats(futures, objectives)
+
+        if best_of == float('inf'):
+            raise RuntimeError("Portfolio found no solution within time limit.")
+
+    def _gather_stats(self, futures: dict, objectives: Dict[str, List[float]]) -> None:
+        for name, values in objectives.items():
+            self.stats[name]['skipped'] += sum(future.cancelled() for future in futures if futures[future] == name)
+            self.stats[name]['runs'] = len(values)
+            if values:
+                self.stats[name]['best'] = min(values)
+                self.stats[name]['mean'] = sum(values) / len(values)
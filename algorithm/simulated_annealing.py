@@ -1,11 +1,11 @@
 import copy
 import logging
 import random
-from typing import Callable
+from typing import Callable, Iterator, Optional
 
 import numpy as np
 
-from core import AbstractMover, PartialSolution, Instance_T, LocalSearch
+from core import AbstractMover, Budget, PartialSolution, Instance_T, LocalSearch
 
 
 logger = logging.getLogger(__name__)
@@ -45,30 +45,51 @@ class SimulatedAnnealing(LocalSearch):
         self.t_min = t_min
         self.max_iter = max_iter
 
-    def solve(self, _: Instance_T, __: int) -> PartialSolution:
+    def iter_solve(self, _: Instance_T, __: int, budget: Optional[Budget] = None) -> Iterator[PartialSolution]:
+        recorder = self.recorder
         t_cur = self.t_max
-        ps_cur = self.ps
+        ps_cur = copy.deepcopy(self.ps)
+        ps_cur.build_index()
         of_cur = ps_cur.squared_error
         ps_best = copy.deepcopy(ps_cur)
         of_best = ps_best.squared_error
+        recorder.objective(of_best)
+        yield ps_best
+        if budget is not None and budget.improved(ps_best):
+            return
+
         _iter = 1
         while _iter <= self.max_iter and t_cur > self.t_min:
+            if budget is not None and budget.tick():
+                break
             if (_iter + 1) % 100 == 0:
                 logger.info(f"Starting {_iter + 1} SA iteration.")
 
-            ps_new = copy.deepcopy(ps_cur)
-            self.move.move(ps_new)
-
-            of_new = ps_new.squared_error
-            logger.debug(f'NEW OF {of_new}')
-
-            if of_cur > of_new or random.random() < np.exp(-(of_new - of_cur) / t_cur):
-                ps_cur = ps_new
-                of_cur = of_new
+            # move is applied inplace and undone if rejected
+            with recorder.phase('move'):
+                record, delta = self.move.move_record(ps_cur)
+            recorder.count('moves_proposed')
+            logger.debug(f'NEW OF {of_cur + delta}')
+
+            with recorder.phase('evaluation'):
+                accepted = delta < 0 or random.random() < np.exp(-delta / t_cur)
+            recorder.count('objective_evaluations')
+            if accepted:
+                of_cur = ps_cur.squared_error
+                recorder.count('moves_accepted')
+            else:
+                with recorder.phase('bookkeeping'):
+                    ps_cur.undo(record)
 
             if of_best > of_cur:
                 of_best = of_cur
-                ps_best = ps_cur
+                with recorder.phase('bookkeeping'):
+                    ps_best = copy.deepcopy(ps_cur)
+                recorder.count('deep_copies')
+                recorder.objective(of_best)
+                yield ps_best
+                if budget is not None and budget.improved(ps_best):
+                    break
 
             _iter += 1
             t_cur = self.temperature_func(
@@ -79,5 +100,3 @@ class SimulatedAnnealing(LocalSearch):
             )
 
             logger.debug(f'SIMULATED ANNEALING: STATE: T={t_cur}, ITERATION={_iter}\n')
-
-        return ps_best
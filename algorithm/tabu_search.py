@@ -1,8 +1,8 @@
 import copy
 import logging
-from collections import deque
+from typing import Iterator, Optional
 
-from core import Instance_T, PartialSolution, LocalSearch, AbstractMover
+from core import Budget, Instance_T, PartialSolution, LocalSearch, AbstractMover, TabuList
 
 logger = logging.getLogger(__name__)
 
@@ -27,23 +27,38 @@ class TabuSearch(LocalSearch):
         self.ttl = ttl
         self.max_iter = max_iter
 
-    def solve(self, data: Instance_T, m: int) -> PartialSolution:
+    def iter_solve(self, data: Instance_T, m: int, budget: Optional[Budget] = None) -> Iterator[PartialSolution]:
+        recorder = self.recorder
         cur_sol = copy.deepcopy(self.ps)
+        cur_sol.build_index()
         best_sol = self.ps
-        seen = deque([hash(cur_sol)])
+        recorder.objective(best_sol.squared_error)
+        yield best_sol
+        if budget is not None and budget.improved(best_sol):
+            return
+
+        seen = TabuList(self.ttl)
+        seen.add(cur_sol.zobrist_hash)
         for ii in range(self.max_iter):
+            if budget is not None and budget.tick():
+                break
             if (ii + 1) % 100 == 0:
                 logger.info(f"Starting {ii + 1} TS iteration.")
 
-            self.move.move(cur_sol, seen=seen)
+            # tabu moves report size of the neighbourhood they searched
+            with recorder.phase('move'):
+                self.move.move(cur_sol, seen=seen, best=best_sol.squared_error, recorder=recorder)
+            recorder.count('moves_accepted')
 
             if cur_sol.squared_error < best_sol.squared_error:
-                best_sol = copy.deepcopy(cur_sol)
-
-            seen.append(hash(cur_sol))
-            # чистим устаревшие запреты
-            while len(seen) >= self.ttl:
-                seen.popleft()
+                with recorder.phase('bookkeeping'):
+                    best_sol = copy.deepcopy(cur_sol)
+                recorder.count('deep_copies')
+                recorder.objective(best_sol.squared_error)
+                yield best_sol
+                if budget is not None and budget.improved(best_sol):
+                    break
 
-        return best_sol
+            with recorder.phase('bookkeeping'):
+                seen.add(cur_sol.zobrist_hash)
 
@@ -0,0 +1,8 @@
+"""
+Reproducible benchmarks of MNP solvers:
+seeded instance generators, runner and results storage
+"""
+
+from .generators import *
+from .runner import *
+from .storage import *
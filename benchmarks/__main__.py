@@ -0,0 +1,42 @@
+import argparse
+import logging
+
+from .generators import GENERATORS
+from .runner import default_solvers, run_benchmarks
+from .storage import ResultStore
+
+
+def main():
+    solvers = default_solvers()
+    parser = argparse.ArgumentParser(description="Benchmark MNP solvers and store results in SQLite file.")
+    parser.add_argument('--db', default='benchmarks.sqlite')
+    parser.add_argument('--solvers', nargs='+', default=list(solvers), choices=list(solvers))
+    parser.add_argument('--generators', nargs='+', default=list(GENERATORS), choices=list(GENERATORS))
+    parser.add_argument('--n', nargs='+', type=int, default=[100, 1000])
+    parser.add_argument('--m', nargs='+', type=int, default=[2, 5])
+    parser.add_argument('--seeds', nargs='+', type=int, default=[0, 1, 2])
+    parser.add_argument('--time-limit', type=float, default=10.)
+    parser.add_argument('--no-memory', action='store_true', help="skip second run of every solver that traces peak memory")
+    parser.add_argument('--version', default=None, help="label of results, git commit by default")
+    parser.add_argument('--compare', default=None, help="version to report regressions against")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    store = ResultStore(args.db)
+    version = None
+    for record in run_benchmarks(
+        {name: solvers[name] for name in args.solvers}, args.generators,
+        args.n, args.m, args.seeds, args.time_limit, not args.no_memory, args.version,
+    ):
+        store.add([record])
+        version = record['version']
+        print(f"{record['solver']:>24} {record['generator']:>12} n={record['n']} m={record['m']} "
+              f"seed={record['seed']} time={record['wall_time']:.3f}s of={record['squared_error']:.6g}")
+
+    if args.compare and version:
+        for regression in store.compare(args.compare, version):
+            print("REGRESSION", regression)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+import math
+from typing import Callable, Dict
+
+import numpy as np
+
+
+Generator_T = Callable[[int, int, int], np.ndarray]
+
+
+def uniform(n: int, m: int, seed: int, max_value: int = 10 ** 6) -> np.ndarray:
+    """ Uniform integers from [1, max_value] """
+    return np.random.default_rng(seed).integers(1, max_value, size=n, endpoint=True)
+
+
+def exponential(n: int, m: int, seed: int, scale: float = 10 ** 5) -> np.ndarray:
+    """ Exponentially distributed integers with mean about scale, at least 1 """
+    return np.random.default_rng(seed).exponential(scale, size=n).astype(np.int64) + 1
+
+
+def hard(n: int, m: int, seed: int, ratio: float = 1.) -> np.ndarray:
+    """
+    Uniform integers of about ratio * n * log2(m) / (m - 1) bits, near the
+    phase transition where perfect partitions stop to exist (n bits for m = 2).
+    Bits are capped so that sum of values fits int64.
+    """
+    bits = round(ratio * n * math.log2(m) / (m - 1)) if m > 1 else n
+    bits = min(max(bits, 1), 62 - math.ceil(math.log2(max(n, 2))))
+    return np.random.default_rng(seed).integers(1, 1 << bits, size=n, endpoint=True)
+
+
+def planted(n: int, m: int, seed: int, max_value: int = 10 ** 6) -> np.ndarray:
+    """
+    Instance with a perfect partition: items are dealt to m sets,
+    the last item of every set completes it to the same sum. Requires n >= m.
+    """
+    if n < m:
+        raise ValueError("Planted instance needs at least one item per set.")
+    rng = np.random.default_rng(seed)
+    values = rng.integers(1, max_value, size=n, endpoint=True)
+    sets = rng.permutation(np.arange(n) % m)
+    last = np.array([np.flatnonzero(sets == j)[-1] for j in range(m)])
+    values[last] = 0
+    sums = np.bincount(sets, weights=values, minlength=m).astype(np.int64)
+    values[last] = sums.max() + 1 - sums
+    return values
+
+
+GENERATORS: Dict[str, Generator_T] = {
+    'uniform': uniform,
+    'exponential': exponential,
+    'hard': hard,
+    'planted': planted,
+}
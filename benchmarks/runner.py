@@ -0,0 +1,115 @@
+import logging
+import os
+import random
+import subprocess
+import time
+import tracemalloc
+from itertools import product
+from typing import Dict, Iterable, Iterator, Optional
+
+import numpy as np
+
+from algorithm import (
+    ACO, BatchGeneticAlgorithm, CompleteKarmarkarKarp, GreedySolver, KarmarkarKarp,
+    RandomSolver, SimulatedAnnealing, TabuSearch, temperature_div,
+)
+from core import (
+    AbstractSolver, Budget, ConsequentMover, Instance, RandomMover, SolverFactory,
+    greedy_transp_one, max_to_min, tabu_best_move,
+)
+from .generators import GENERATORS
+
+
+logger = logging.getLogger(__name__)
+
+
+def default_solvers() -> Dict[str, SolverFactory]:
+    return {
+        'random': lambda instance, m: RandomSolver(),
+        'greedy': lambda instance, m: GreedySolver(),
+        'karmarkar_karp': lambda instance, m: KarmarkarKarp(),
+        'complete_karmarkar_karp': lambda instance, m: CompleteKarmarkarKarp(),
+        'simulated_annealing': lambda instance, m: SimulatedAnnealing(
+            GreedySolver().solve(instance, m), RandomMover([greedy_transp_one, max_to_min]), temperature_div,
+        ),
+        'tabu_search': lambda instance, m: TabuSearch(
+            GreedySolver().solve(instance, m), ConsequentMover([tabu_best_move]), ttl=20, max_iter=200,
+        ),
+        'aco': lambda instance, m: ACO(ants_n=20, max_iter=20),
+        'batch_genetic': lambda instance, m: BatchGeneticAlgorithm(population_size=200, max_iter=100),
+    }
+
+
+def git_version() -> str:
+    """ Short hash of current commit, 'unknown' out of git repository """
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def measure(solver: AbstractSolver, instance: Instance, time_limit: Optional[float] = None) -> dict:
+    """ Runs solver till the end or time limit, returns wall time, iterations counted by budget and errors """
+    budget = Budget(time_limit=time_limit)
+    start = time.perf_counter()
+    ps = None
+    for ps in solver.iter_solve(instance, instance.m, budget):
+        pass
+    wall_time = time.perf_counter() - start
+    return {
+        'wall_time': wall_time,
+        'iterations': budget.iterations,
+        'iterations_per_sec': budget.iterations / wall_time if wall_time > 0 else None,
+        'squared_error': ps.squared_error,
+        'abs_error': ps.abs_error,
+    }
+
+
+def peak_memory(solver: AbstractSolver, instance: Instance, time_limit: Optional[float] = None) -> int:
+    """
+    Peak traced memory (bytes) of solver run. tracemalloc slows allocations
+    down several times, so it has own run and is never mixed with timings.
+    """
+    tracemalloc.start()
+    try:
+        for _ in solver.iter_solve(instance, instance.m, Budget(time_limit=time_limit)):
+            pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmarks(
+        solvers: Optional[Dict[str, SolverFactory]] = None,
+        generators: Iterable[str] = tuple(GENERATORS),
+        ns: Iterable[int] = (100, 1000),
+        ms: Iterable[int] = (2, 5),
+        seeds: Iterable[int] = (0, 1, 2),
+        time_limit: Optional[float] = 10.,
+        trace_memory: bool = True,
+        version: Optional[str] = None,
+) -> Iterator[dict]:
+    """ Sweeps every solver over generators, n, m and seeds, yields one record per run """
+    solvers = solvers or default_solvers()
+    version = version or git_version()
+    for generator, n, m, seed in product(generators, ns, ms, seeds):
+        instance = Instance(GENERATORS[generator](n, m, seed), m)
+        for name, factory in solvers.items():
+            random.seed(seed)
+            np.random.seed(seed)
+            solver = factory(instance, m)
+            logger.info(f"Running {name} on {generator} n={n} m={m} seed={seed}.")
+            record = {
+                'version': version, 'timestamp': time.time(),
+                'solver': name, 'generator': generator, 'n': n, 'm': m, 'seed': seed,
+            }
+            record.update(measure(solver, instance, time_limit))
+            record['peak_memory'] = None
+            if trace_memory:
+                random.seed(seed)
+                np.random.seed(seed)
+                record['peak_memory'] = peak_memory(factory(instance, m), instance, time_limit)
+            yield record
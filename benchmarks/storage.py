@@ -0,0 +1,73 @@
+import sqlite3
+from typing import Dict, Iterable, List, Optional
+
+
+_COLUMNS = (
+    ('version', 'TEXT'),
+    ('timestamp', 'REAL'),
+    ('solver', 'TEXT'),
+    ('generator', 'TEXT'),
+    ('n', 'INTEGER'),
+    ('m', 'INTEGER'),
+    ('seed', 'INTEGER'),
+    ('wall_time', 'REAL'),
+    ('peak_memory', 'INTEGER'),
+    ('iterations', 'INTEGER'),
+    ('iterations_per_sec', 'REAL'),
+    ('squared_error', 'REAL'),
+    ('abs_error', 'REAL'),
+)
+_KEY = ('solver', 'generator', 'n', 'm', 'seed')
+
+
+class ResultStore:
+    """ SQLite file with benchmark records, one row per solver run """
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as connection:
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS results ({', '.join(f'{c} {t}' for c, t in _COLUMNS)})"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def add(self, records: Iterable[dict]) -> None:
+        columns = [c for c, _ in _COLUMNS]
+        with self._connect() as connection:
+            connection.executemany(
+                f"INSERT INTO results ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                ([record.get(c) for c in columns] for record in records),
+            )
+
+    def fetch(self, version: Optional[str] = None) -> List[dict]:
+        with self._connect() as connection:
+            if version is None:
+                rows = connection.execute("SELECT * FROM results")
+            else:
+                rows = connection.execute("SELECT * FROM results WHERE version = ?", (version,))
+            return [dict(row) for row in rows]
+
+    def compare(self, base: str, version: str, tolerance: float = 0.2) -> List[Dict]:
+        """
+        Runs of version which are more than tolerance slower
+        or have worse objective than the same runs of base version
+        """
+        base_runs = {tuple(r[k] for k in _KEY): r for r in self.fetch(base)}
+        regressions = []
+        for run in self.fetch(version):
+            old = base_runs.get(tuple(run[k] for k in _KEY))
+            if old is None:
+                continue
+            slower = run['wall_time'] > old['wall_time'] * (1 + tolerance)
+            worse = run['squared_error'] > old['squared_error'] * (1 + tolerance)
+            if slower or worse:
+                regressions.append({
+                    **{k: run[k] for k in _KEY},
+                    'wall_time': (old['wall_time'], run['wall_time']),
+                    'squared_error': (old['squared_error'], run['squared_error']),
+                })
+        return regressions
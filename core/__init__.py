@@ -1,3 +1,4 @@
 from .data_source import *
+from .instrumentation import *
 from .moves import *
 from .structures import *
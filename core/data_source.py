@@ -1,12 +1,20 @@
 import re
+import glob
 import os.path
 import logging
+import struct
+import warnings
+import zlib
 
 from typing import (
-    Callable, Iterable, Collection,
-    Generic, TypeVar, Union,
+    Callable, Deque, Iterable, Iterator, Collection,
+    Generic, List, Tuple, TypeVar, Union,
 )
 from abc import ABCMeta, abstractmethod
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
 
 
 logger = logging.getLogger(__name__)
@@ -56,33 +64,251 @@ class PythonSource(DataSource):
 class FileSource(DataSource[str, _V]):
     """
     Class to work with external files.
+    File is read by chunks of chunk_size chars, so only
+    gathered data is kept in memory.
 
-    :param _strip_chars - chars that are to be stripped from string;
+    :param _strip_chars - chars that are to be stripped from string,
+        treated as separators while reading by chunks;
     :param _split_chars_re - regular expression to define splitting sequences;
+    :param _separator_chars - non-whitespace separating chars for get_array;
     """
 
     _strip_chars = ' \n'
     _split_chars_re = '[, \n]+'
+    _separator_chars = ','
 
-    def __init__(self, filepath: str, **kwargs):
+    def __init__(self, filepath: str, chunk_size: int = 1 << 20, **kwargs):
         if not os.path.isfile(filepath):
             raise ValueError(f'File {filepath} not exist!')
 
         super(FileSource, self).__init__(**kwargs)
         self.filepath = filepath
+        self.chunk_size = chunk_size
 
     def _map_data_iter(self) -> Iterable[_V]:
         return self._parse_from_file()
 
     def _parse_from_file(self) -> Iterable[_V]:
+        return map(self._mapper, self._iter_tokens())
+
+    def _iter_tokens(self) -> Iterator[str]:
+        """ Tokens of file, token split between chunks is carried to the next one """
+        split = re.compile(f'(?:{self._split_chars_re}|[{re.escape(self._strip_chars)}])+')
         with open(self.filepath, 'r') as file:
             logger.info(f"Parsing file '{self.filepath}'.")
-            _out = file.read()
-        _out_seq = re.split(self._split_chars_re, _out.strip(self._strip_chars))
-        return map(self._mapper, _out_seq)
+            tail = ''
+            for chunk in iter(lambda: file.read(self.chunk_size), ''):
+                tokens = split.split(tail + chunk)
+                tail = tokens.pop()
+                yield from filter(None, tokens)
+            if tail:
+                yield tail
+
+    def get_array(self) -> np.ndarray:
+        """
+        Fast path for plain numeric files: numbers are parsed
+        by chunks straight to int64 array, mapper and gatherer are not used.
+        """
+        separators = (self._strip_chars + self._separator_chars).encode()
+        table = bytes.maketrans(separators, b' ' * len(separators))
+        parts = []
+        with open(self.filepath, 'rb') as file:
+            logger.info(f"Parsing file '{self.filepath}' to array.")
+            tail = b''
+            for chunk in iter(lambda: file.read(self.chunk_size), b''):
+                text = (tail + chunk).translate(table)
+                # the last token could be continued in the next chunk
+                cut = max(text.rfind(b' '), text.rfind(b'\n')) + 1
+                tail = text[cut:]
+                parts.append(self._parse_numbers(text[:cut]))
+            parts.append(self._parse_numbers(tail))
+        return np.concatenate(parts)
+
+    def _parse_numbers(self, text: bytes) -> np.ndarray:
+        if not text.strip():
+            return np.empty(0, dtype=np.int64)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DeprecationWarning)
+            values = np.fromstring(text, dtype=np.int64, sep=' ')
+        if len(values) != _count_tokens(text):
+            raise ValueError(f"File '{self.filepath}' has non-integer tokens.")
+        return values
+
+
+_WHITESPACE = np.zeros(256, dtype=bool)
+_WHITESPACE[list(b' \t\n\r\x0b\x0c')] = True
+
+
+def _count_tokens(text: bytes) -> int:
+    """ len(text.split()) without creating the tokens: counts starts of non-whitespace runs """
+    space = _WHITESPACE[np.frombuffer(text, dtype=np.uint8)]
+    if not len(space):
+        return 0
+    return int(not space[0]) + int(np.count_nonzero(space[:-1] & ~space[1:]))
 
 
 class WMFileSource(FileSource):
     """ Class to work with dumped Wolfram Mathematica Lists. """
     _strip_chars = '{} \n'
     _split_chars_re = '[, \n]+'
+    _separator_chars = ','
+
+
+# magic, version, dtype (numpy str, e.g. '<i8'), n, crc32 of values; padded to 32 bytes to align values
+_BINARY_HEADER = struct.Struct('<4sH4sQI10x')
+_BINARY_MAGIC = b'MNPB'
+_BINARY_VERSION = 1
+
+
+def _crc32(values: np.ndarray, chunk_size: int = 1 << 24) -> int:
+    data = np.ascontiguousarray(values).data.cast('B')
+    crc = 0
+    for start in range(0, len(data), chunk_size):
+        crc = zlib.crc32(data[start:start + chunk_size], crc)
+    return crc
+
+
+def write_binary(filepath: str, values: Iterable[int], dtype: Union[str, np.dtype] = '<i8') -> None:
+    """ Writes values in binary instance format: header with n, dtype and checksum, then raw little-endian values """
+    dtype = np.dtype(dtype).newbyteorder('<')
+    if dtype.kind not in 'iu':
+        raise ValueError(f"Binary instance must be of integer type, got {dtype}.")
+    values = np.asarray(values if isinstance(values, np.ndarray) else list(values)).astype(dtype, copy=False)
+    with open(filepath, 'wb') as file:
+        file.write(_BINARY_HEADER.pack(
+            _BINARY_MAGIC, _BINARY_VERSION, dtype.str.encode(), len(values), _crc32(values),
+        ))
+        values.tofile(file)
+
+
+def convert_to_binary(filepath: str, binary_path: str, dtype: Union[str, np.dtype] = '<i8') -> None:
+    """ Converts text instance (WM list if file ends with .wm, plain numbers otherwise) to binary format """
+    source = WMFileSource(filepath) if filepath.endswith('.wm') else FileSource(filepath)
+    write_binary(binary_path, source.get_array(), dtype)
+
+
+class MmapSource(DataSource[int, _V]):
+    """
+    Class to work with binary instances (see write_binary).
+    get_array maps values zero-copy, so pages are shared between processes.
+
+    :param verify - check checksum of values on opening (reads whole file);
+    """
+
+    def __init__(self, filepath: str, verify: bool = False, **kwargs):
+        if not os.path.isfile(filepath):
+            raise ValueError(f'File {filepath} not exist!')
+
+        super(MmapSource, self).__init__(**kwargs)
+        self.filepath = filepath
+        self.dtype, self.n, self.crc = self._read_header()
+        if verify and _crc32(self.get_array()) != self.crc:
+            raise ValueError(f"File '{filepath}' checksum mismatch.")
+
+    def _read_header(self) -> Tuple[np.dtype, int, int]:
+        with open(self.filepath, 'rb') as file:
+            header = file.read(_BINARY_HEADER.size)
+        if len(header) < _BINARY_HEADER.size:
+            raise ValueError(f"File '{self.filepath}' is not a binary instance.")
+        magic, version, dtype, n, crc = _BINARY_HEADER.unpack(header)
+        if magic != _BINARY_MAGIC:
+            raise ValueError(f"File '{self.filepath}' is not a binary instance.")
+        if version != _BINARY_VERSION:
+            raise ValueError(f"Unsupported binary instance version {version}.")
+        size = os.path.getsize(self.filepath) - _BINARY_HEADER.size
+        dtype = np.dtype(dtype.rstrip(b'\x00').decode())
+        if size != n * dtype.itemsize:
+            raise ValueError(f"File '{self.filepath}' is truncated.")
+        return dtype, n, crc
+
+    def get_array(self) -> np.ndarray:
+        """ Read-only memory map of values """
+        if self.n == 0:
+            return np.empty(0, dtype=self.dtype)
+        return np.memmap(self.filepath, dtype=self.dtype, mode='r', offset=_BINARY_HEADER.size, shape=(self.n,))
+
+    def _map_data_iter(self) -> Iterable[_V]:
+        return map(self._mapper, self.get_array().tolist())
+
+
+def read_array(filepath: str) -> np.ndarray:
+    """ Values of instance file: binary instance, WM list (.wm) or plain numbers """
+    with open(filepath, 'rb') as file:
+        binary = file.read(len(_BINARY_MAGIC)) == _BINARY_MAGIC
+    if binary:
+        return MmapSource(filepath).get_array()
+    if filepath.endswith('.wm'):
+        return WMFileSource(filepath).get_array()
+    return FileSource(filepath).get_array()
+
+
+class GlobSource(DataSource[Tuple[str, Union[np.ndarray, Exception]], _V]):
+    """
+    Class to work with many instance files matching glob pattern.
+    Files are parsed (see read_array) in background `pool` ('thread' or 'process')
+    while instances are consumed, at most queue_size parsed instances wait for consumer.
+    Iteration yields mapped (path, values) pairs in order of sorted paths.
+
+    :param errors - 'raise' to stop on file that can't be read, 'return' to yield
+        (path, exception) for it and go on;
+    """
+
+    def __init__(
+        self,
+        pattern: str,
+        workers: int = 2,
+        queue_size: int = 8,
+        pool: str = 'thread',
+        errors: str = 'raise',
+        gatherer: Gatherer[_V] = list,
+        mapper: Mapper[Tuple[str, Union[np.ndarray, Exception]], _V] = tuple,
+    ):
+        if pool not in ('thread', 'process'):
+            raise ValueError(f"Unknown pool type {pool}.")
+        if errors not in ('raise', 'return'):
+            raise ValueError(f"Unknown errors mode {errors}.")
+
+        super(GlobSource, self).__init__(gatherer=gatherer, mapper=mapper)
+        self.pattern = pattern
+        self.workers = workers
+        self.queue_size = queue_size
+        self.pool = pool
+        self.errors = errors
+
+    def paths(self) -> List[str]:
+        return sorted(path for path in glob.iglob(self.pattern, recursive=True) if os.path.isfile(path))
+
+    def _executor(self) -> Executor:
+        if self.pool == 'thread':
+            return ThreadPoolExecutor(max_workers=self.workers)
+        return ProcessPoolExecutor(max_workers=self.workers)
+
+    def __iter__(self) -> Iterator[_V]:
+        return iter(self._map_data_iter())
+
+    def _map_data_iter(self) -> Iterable[_V]:
+        return map(self._mapper, self._iter_parsed())
+
+    def _result(self, path: str, future: Future) -> Tuple[str, Union[np.ndarray, Exception]]:
+        try:
+            return path, future.result()
+        except Exception as e:
+            if self.errors == 'raise':
+                raise
+            logger.warning(f"Can't read instance '{path}': {e!r}")
+            return path, e
+
+    def _iter_parsed(self) -> Iterator[Tuple[str, Union[np.ndarray, Exception]]]:
+        paths = iter(self.paths())
+        with self._executor() as executor:
+            pending: Deque[Tuple[str, Future]] = deque()
+            try:
+                for path in paths:
+                    pending.append((path, executor.submit(read_array, path)))
+                    if len(pending) >= self.queue_size:
+                        yield self._result(*pending.popleft())
+                while pending:
+                    yield self._result(*pending.popleft())
+            finally:
+                for _, future in pending:
+                    future.cancel()
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import json
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+
+class _Phase:
+    """ Context manager timing one phase of Recorder """
+    __slots__ = ('recorder', 'name', 'start')
+
+    def __init__(self, recorder: Recorder, name: str):
+        self.recorder = recorder
+        self.name = name
+        self.start = 0.
+
+    def __enter__(self) -> _Phase:
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.recorder.add_time(self.name, self.start, time.perf_counter() - self.start)
+
+
+class Recorder:
+    """
+    Collects what solver does during solving: counters (moves proposed/accepted,
+    objective evaluations, deep copies, ...), time of phases and objective over time.
+
+    Solvers report into their `recorder` attribute, which is NullRecorder
+    by default. With trace=True every phase run is kept (at most max_events)
+    for Chrome trace export.
+    """
+    enabled = True
+
+    def __init__(self, trace: bool = False, max_events: int = 10 ** 6):
+        self.trace = trace
+        self.max_events = max_events
+        self.counters: Counter = Counter()
+        self.phases: Dict[str, float] = defaultdict(float)
+        self.series: List[Tuple[float, float]] = []
+        self.events: List[Tuple[str, float, float]] = []
+        self.origin = time.perf_counter()
+
+    def count(self, name: str, k: int = 1) -> None:
+        self.counters[name] += k
+
+    def phase(self, name: str) -> _Phase:
+        return _Phase(self, name)
+
+    def add_time(self, name: str, start: float, duration: float) -> None:
+        self.phases[name] += duration
+        if self.trace and len(self.events) < self.max_events:
+            self.events.append((name, start - self.origin, duration))
+
+    def objective(self, value: float) -> None:
+        """ Reports objective of new incumbent """
+        self.series.append((time.perf_counter() - self.origin, float(value)))
+
+    def summary(self) -> dict:
+        return {
+            'counters': dict(self.counters),
+            'phases': dict(self.phases),
+            'objective': list(self.series),
+        }
+
+    def to_jsonl(self, path: str) -> None:
+        """ One json object per counter, phase total, objective point and traced phase run """
+        with open(path, 'w') as file:
+            for name, value in self.counters.items():
+                file.write(json.dumps({'type': 'counter', 'name': name, 'value': value}) + '\n')
+            for name, total in self.phases.items():
+                file.write(json.dumps({'type': 'phase', 'name': name, 'total': total}) + '\n')
+            for t, of in self.series:
+                file.write(json.dumps({'type': 'objective', 'time': t, 'value': of}) + '\n')
+            for name, start, duration in self.events:
+                file.write(json.dumps({'type': 'event', 'name': name, 'start': start, 'duration': duration}) + '\n')
+
+    def to_chrome_trace(self, path: str) -> None:
+        """ Trace for chrome://tracing or Perfetto: phase runs as slices, objective as counter track """
+        events = [
+            {'name': name, 'ph': 'X', 'ts': start * 1e6, 'dur': duration * 1e6, 'pid': 0, 'tid': 0}
+            for name, start, duration in self.events
+        ]
+        events += [
+            {'name': 'objective', 'ph': 'C', 'ts': t * 1e6, 'pid': 0, 'args': {'value': value}}
+            for t, value in self.series
+        ]
+        with open(path, 'w') as file:
+            json.dump({'traceEvents': events, 'otherData': {'counters': dict(self.counters)}}, file)
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self) -> _NullPhase:
+        return self
+
+    def __exit__(self, *_) -> None:
+        pass
+
+
+class NullRecorder:
+    """ Recorder that records nothing, each report costs one method call """
+    enabled = False
+    _phase = _NullPhase()
+
+    def count(self, name: str, k: int = 1) -> None:
+        pass
+
+    def phase(self, name: str) -> _NullPhase:
+        return self._phase
+
+    def objective(self, value: float) -> None:
+        pass
+
+
+NULL_RECORDER = NullRecorder()
@@ -3,12 +3,12 @@ from __future__ import annotations
 import copy
 import random
 from abc import abstractmethod, ABCMeta
-from itertools import product
-from typing import cast, List, Iterable, Protocol
+from typing import List, Iterable, Optional, Protocol, Tuple
 
 import numpy as np
 
-from .structures import PartialSolution
+from .instrumentation import NULL_RECORDER
+from .structures import PartialSolution, MoveRecord
 
 
 class Move_T(Protocol):
@@ -27,6 +27,19 @@ class AbstractMover(metaclass=ABCMeta):
         """ Changes some PartialSolution inplace """
         raise NotImplementedError
 
+    def move_record(self, ps: PartialSolution, **kwargs) -> Tuple[MoveRecord, float]:
+        """
+        Applies move inplace and returns its record
+        with change of squared error, so move could be undone by ps.undo
+        """
+        of_old = ps.squared_error
+        ps.start_journal()
+        try:
+            self.move(ps, **kwargs)
+        finally:
+            record = ps.stop_journal()
+        return record, ps.squared_error - of_old
+
     def move_n(self, ps: PartialSolution, n: int, **kwargs) -> PartialSolution:
         """ Apply class move N times """
         for _ in range(n):
@@ -63,14 +76,14 @@ class AbstractMover(metaclass=ABCMeta):
 class RandomMover(AbstractMover):
     """ Applies random move of self.moves """
     def move(self, ps: PartialSolution, **kwargs) -> PartialSolution:
-        return random.choice(self.moves)(ps)
+        return random.choice(self.moves)(ps, **kwargs)
 
 
 class ConsequentMover(AbstractMover):
     """ Applies all moves in self.moves consequently """
     def move(self, ps: PartialSolution, **kwargs) -> PartialSolution:
         for _move in self.moves:
-            _move(ps)
+            _move(ps, **kwargs)
         return ps
 
 
@@ -78,7 +91,7 @@ def greedy_transp_one(ps: PartialSolution, **_) -> PartialSolution:
     """ One greedy step with random element """
     idx = random.randint(0, ps.n - 1)
     ps.reset_item(idx)
-    ps.put_item(idx, cast(int, np.argmin(ps.sums)))
+    ps.put_item(idx, ps.argmin_sum())
     return ps
 
 
@@ -92,7 +105,7 @@ def greedy_transp_many(ps: PartialSolution, max_to_transp=None, **_) -> PartialS
         ps.reset_item(idx)
 
     for value, idx in sorted(((ps.cost[idx], idx) for idx in idx_list), reverse=True):
-        ps.put_item(idx, cast(int, np.argmin(ps.sums)))
+        ps.put_item(idx, ps.argmin_sum())
 
     return ps
 
@@ -107,50 +120,204 @@ def reassign_one(ps: PartialSolution, i: int = -1, j: int = -1, **_) -> PartialS
 
 def max_to_min(ps: PartialSolution, **_) -> PartialSolution:
     """ Random element from max-sum set to min-sum set """
-    max_idx = cast(int, np.argmax(ps.sums))
-    min_idx = cast(int, np.argmin(ps.sums))
-    elem_idx = random.choice(ps.get_index_list(max_idx))
-    ps.put_item(elem_idx, min_idx)
+    max_idx = ps.argmax_sum()
+    min_idx = ps.argmin_sum()
+    ps.put_item(ps.random_item(max_idx), min_idx)
+    return ps
+
+
+def _ranked(gains: np.ndarray, k: int) -> np.ndarray:
+    """ Flat indices of k largest gains in decreasing order """
+    flat = gains.ravel()
+    k = min(k, flat.size)
+    if k == 0:
+        return np.empty(0, dtype=np.intp)
+    top = np.argpartition(-flat, k - 1)[:k]
+    return top[np.argsort(-flat[top], kind='stable')]
+
+
+def _closest_pairs(left: np.ndarray, right: np.ndarray, target: float, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Up to k pairs of positions (a, b) with left[a] - right[b] closest to target,
+    the closest first. Every left value is binary searched in sorted right,
+    so it takes O((|left| + |right|) log |right| + |left| k).
+    """
+    order = np.argsort(right, kind='stable')
+    sorted_right = right[order]
+    window = np.arange(-k, k)
+    positions = np.searchsorted(sorted_right, left - target)[:, None] + window[None, :]
+    valid = (positions >= 0) & (positions < len(right))
+    positions = np.clip(positions, 0, len(right) - 1)
+    dist = np.abs(left[:, None] - sorted_right[positions] - target)
+    dist[~valid] = np.inf
+    best = _ranked(-dist, k)
+    best = best[np.isfinite(dist.ravel()[best])]
+    a, w = np.divmod(best, len(window))
+    return a, order[positions[a, w]]
+
+
+def _best_swaps(ps: PartialSolution, max_indices: np.ndarray, min_indices: np.ndarray, k: int,
+                squared: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Up to k swaps between items of max-sum and min-sum sets with the largest gains,
+    as positions in max_indices, positions in min_indices and gains, the best first.
+    Gain of such swap only depends on difference of costs and grows as it gets closer
+    to half of difference of the sums, so pairs are found by _closest_pairs
+    instead of evaluating all |max_indices| x |min_indices| of them.
+    """
+    diff = int(ps.sums[ps.partitioning[max_indices[0]]]) - int(ps.sums[ps.partitioning[min_indices[0]]])
+    a, b = _closest_pairs(ps.cost[max_indices], ps.cost[min_indices], diff / 2, k)
+    return a, b, ps.delta_swap_pairs(max_indices[a], min_indices[b], squared)
+
+
+def balance_swap(ps: PartialSolution, seen=None, k: Optional[int] = None, two_for_one: bool = False,
+                 pool: int = 256, recorder=NULL_RECORDER, **_) -> PartialSolution:
+    """
+    Exchange between max-sum and min-sum sets with difference of costs closest
+    to half of difference of their sums, found by binary search in sorted costs.
+    The k closest exchanges (len(seen) + 1 by default) are checked, the first
+    non-tabu one decreasing difference of the two sets is applied.
+    With two_for_one pairs of max-set items (out of `pool` random ones)
+    are exchanged for single min-set items as well.
+    """
+    if seen is None:
+        seen = []
+    k = k or len(seen) + 1
+
+    max_idx = ps.argmax_sum()
+    min_idx = ps.argmin_sum()
+    max_indices = ps.get_index_list(max_idx)
+    min_indices = ps.get_index_list(min_idx)
+    if max_idx == min_idx or not len(max_indices) or not len(min_indices):
+        return ps
+
+    diff = int(ps.sums[max_idx]) - int(ps.sums[min_idx])
+    min_costs = ps.cost[min_indices]
+    # (new difference of the two sets, items to min-sum set, items to max-sum set)
+    candidates: List[Tuple[int, Tuple[int, ...], Tuple[int, ...]]] = []
+    max_costs = ps.cost[max_indices]
+    for a, b in zip(*_closest_pairs(max_costs, min_costs, diff / 2, k)):
+        candidates.append((
+            abs(diff - 2 * int(max_costs[a] - min_costs[b])), (max_indices[a],), (min_indices[b],),
+        ))
+    if two_for_one and len(max_indices) > 1:
+        if len(max_indices) > pool:
+            max_indices = np.array(random.sample(max_indices.tolist(), pool))
+        first, second = np.triu_indices(len(max_indices), 1)
+        pair_costs = ps.cost[max_indices[first]] + ps.cost[max_indices[second]]
+        for a, b in zip(*_closest_pairs(pair_costs, min_costs, diff / 2, k)):
+            candidates.append((
+                abs(diff - 2 * int(pair_costs[a] - min_costs[b])),
+                (max_indices[first[a]], max_indices[second[a]]), (min_indices[b],),
+            ))
+
+    recorder.count('moves_proposed', len(max_costs) * len(min_costs) + (
+        len(max_indices) * (len(max_indices) - 1) // 2 * len(min_costs) if two_for_one else 0
+    ))
+    recorder.count('objective_evaluations', len(candidates))
+    for new_diff, to_min, to_max in sorted(candidates, key=lambda c: c[0])[:k]:
+        if new_diff >= diff:
+            break
+        moves = [(int(i), min_idx) for i in to_min] + [(int(i), max_idx) for i in to_max]
+        if ps.hash_moves(moves) not in seen:
+            for i, j in moves:
+                ps.put_item(i, j)
+            break
+
     return ps
 
 
-def tabu_transp_one(ps: PartialSolution, seen=None, **_) -> PartialSolution:
+def tabu_transp_one(ps: PartialSolution, seen=None, recorder=NULL_RECORDER, **_) -> PartialSolution:
     if seen is None:
         seen = []
+    recorder.count('moves_proposed', ps.m)
 
-    best_d = 0
+    best_d = 0.
     i = random.randint(0, ps.n - 1)
     best_j = None
     for j in range(ps.m):
         if ps.hash_put(i, j) not in seen:
             d = ps.delta_put(i, j)
+            recorder.count('objective_evaluations')
             if d > best_d:
                 best_j = j
                 best_d = d
-    if best_j:
+    if best_j is not None:
         ps.put_item(i, best_j)
 
     return ps
 
 
-def tabu_swap_min_max(ps: PartialSolution, seen=None, **_) -> PartialSolution:
+def tabu_swap_min_max(ps: PartialSolution, seen=None, recorder=NULL_RECORDER, **_) -> PartialSolution:
     if seen is None:
         seen = []
 
-    max_idx = cast(int, np.argmax(ps.sums))
-    min_idx = cast(int, np.argmin(ps.sums))
+    max_idx = ps.argmax_sum()
+    min_idx = ps.argmin_sum()
     max_indices = ps.get_index_list(max_idx)
     min_indices = ps.get_index_list(min_idx)
-    best_d = 0
-    best_pair = None
-    for i, j in product(max_indices, min_indices):
-        if ps.hash_swap(i, j) not in seen:
-            d = ps.delta_swap(i, j)
-            if d > best_d:
-                best_d = d
-                best_pair = i, j
-    if best_pair:
-        ps.put_item(best_pair[0], min_idx)
-        ps.put_item(best_pair[1], max_idx)
+    if max_idx == min_idx or not len(max_indices) or not len(min_indices):
+        return ps
+
+    # only tabu pairs could be skipped, so the first len(seen) + 1 are enough
+    a_s, b_s, gains = _best_swaps(ps, max_indices, min_indices, len(seen) + 1)
+    recorder.count('moves_proposed', len(max_indices) * len(min_indices))
+    recorder.count('objective_evaluations', len(gains))
+    for a, b, gain in zip(a_s, b_s, gains):
+        if gain <= 0:
+            break
+        if ps.hash_swap(max_indices[a], min_indices[b]) not in seen:
+            ps.put_item(max_indices[a], min_idx)
+            ps.put_item(min_indices[b], max_idx)
+            break
+
+    return ps
+
+
+def tabu_best_move(ps: PartialSolution, seen=None, best=None, recorder=NULL_RECORDER, **_) -> PartialSolution:
+    """
+    Steepest tabu step: applies the best by squared error relocation of any item
+    or swap between max-sum and min-sum sets, even if it is worsening.
+    Tabu moves are skipped unless they lead to squared error lower than best (aspiration).
+    Size of the neighbourhood is reported to recorder as proposed moves.
+    """
+    if seen is None:
+        seen = []
+    of = ps.squared_error
+
+    def admissible(gain: float, h: int) -> bool:
+        return h not in seen or (best is not None and of - gain < best)
+
+    choice, choice_gain = [], -np.inf
+    gains = ps.delta_put_all()
+    items = np.flatnonzero(ps.partitioning < ps.m)
+    gains[items, ps.partitioning[items]] = -np.inf
+    recorder.count('moves_proposed', gains.size - len(items))
+    recorder.count('objective_evaluations', gains.size)
+    for flat in _ranked(gains, len(seen) + 1):
+        i, j = divmod(int(flat), ps.m)
+        if gains[i, j] == -np.inf:
+            break
+        if admissible(gains[i, j], ps.hash_put(i, j)):
+            choice, choice_gain = [(i, j)], gains[i, j]
+            break
+
+    max_idx = ps.argmax_sum()
+    min_idx = ps.argmin_sum()
+    max_indices = ps.get_index_list(max_idx)
+    min_indices = ps.get_index_list(min_idx)
+    if max_idx != min_idx and len(max_indices) and len(min_indices):
+        a_s, b_s, gains = _best_swaps(ps, max_indices, min_indices, len(seen) + 1, squared=True)
+        recorder.count('moves_proposed', len(max_indices) * len(min_indices))
+        recorder.count('objective_evaluations', len(gains))
+        for a, b, gain in zip(a_s, b_s, gains):
+            if gain <= choice_gain:
+                break
+            if admissible(gain, ps.hash_swap(max_indices[a], min_indices[b])):
+                choice = [(max_indices[a], min_idx), (min_indices[b], max_idx)]
+                break
+
+    for i, j in choice:
+        ps.put_item(int(i), j)
 
     return ps
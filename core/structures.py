@@ -1,31 +1,286 @@
 from __future__ import annotations
 
+import copy
 import logging
+import mmap
+import random
+import time
+from collections import deque
 from abc import ABCMeta, abstractmethod
-from typing import List, Optional
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
 import numpy as np
 from more_itertools import flatten
 
+from .instrumentation import NULL_RECORDER
+
 
 logger = logging.getLogger(__name__)
 
 
 Elem_T = int
-Instance_T = List[Elem_T]
+# solvers accept plain sequences of numbers as well as built Instance
+Instance_T = Union[Sequence[Elem_T], np.ndarray, 'Instance']
 Solution_T = List[List[Elem_T]]
+# (item, old set, new set) for every item moved; set m stands for unassigned
+MoveRecord = List[Tuple[int, int, int]]
+
+_MASK64 = (1 << 64) - 1
+
+
+def _splitmix64(x: int) -> int:
+    """ splitmix64 finalizer: mixes 64-bit int into pseudo-random one """
+    x = (x + 0x9E3779B97F4A7C15) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+
+def _splitmix64_array(x: np.ndarray) -> np.ndarray:
+    """ _splitmix64 of every element of uint64 array, multiplications wrap around """
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+class Instance:
+    """
+    Read-only MNP instance: numbers to partition and number of sets.
+
+    Instance is shared by reference between all solutions of it,
+    copying (including deepcopy) returns the same object.
+    """
+    __slots__ = ('values', 'n', 'm', 'total', 'perfect', 'max', 'min', 'mean', '_order', '_zobrist')
+    values: np.ndarray
+    n: int
+    m: int
+    total: int
+    perfect: float
+    max: int
+    min: int
+    mean: float
+    _order: Optional[np.ndarray]
+    _zobrist: Optional[np.ndarray]
+
+    def __init__(self, data: Iterable[Elem_T], m: int = 2):
+        values: np.ndarray
+        if isinstance(data, np.memmap) and data.dtype == np.int64 and not data.flags.writeable:
+            # memory mapped values are kept to be shared with other processes
+            values = data
+        else:
+            values = np.asarray(data if isinstance(data, np.ndarray) else list(data), dtype=np.int64)
+        if values.flags.writeable or not values.flags.c_contiguous:
+            values = np.array(values, dtype=np.int64, order='C')
+            values.flags.writeable = False
+
+        _set = super(Instance, self).__setattr__
+        _set('values', values)
+        _set('n', len(values))
+        _set('m', m)
+        _set('total', int(values.sum()))
+        _set('perfect', self.total / m)
+        _set('max', int(values.max()) if self.n else 0)
+        _set('min', int(values.min()) if self.n else 0)
+        _set('mean', self.total / self.n if self.n else 0.)
+        _set('_order', None)
+        _set('_zobrist', None)
+
+    @staticmethod
+    def create(data: Instance_T, m: int) -> Instance:
+        """ Returns data itself if it is already Instance with m sets """
+        if isinstance(data, Instance):
+            return data if data.m == m else Instance(data.values, m)
+        return Instance(data, m)
+
+    @property
+    def order(self) -> np.ndarray:
+        """ Item indices by decreasing value (equal values by decreasing index) """
+        order = self._order
+        if order is None:
+            order = np.lexsort((np.arange(self.n), self.values))[::-1].copy()
+            order.flags.writeable = False
+            super(Instance, self).__setattr__('_order', order)
+        return order
+
+    @property
+    def zobrist(self) -> np.ndarray:
+        """
+        Random 64-bit key of every item for hashing of partitionings, key of
+        (item, set) pair is splitmix64 of item key xor set, set m stands for
+        unassigned item. Keys depend only on n and m.
+        """
+        keys = self._zobrist
+        if keys is None:
+            keys = np.random.default_rng([self.n, self.m]).integers(
+                0, np.iinfo(np.uint64).max, size=self.n, dtype=np.uint64, endpoint=True,
+            )
+            keys.flags.writeable = False
+            super(Instance, self).__setattr__('_zobrist', keys)
+        return keys
+
+    @property
+    def perfect_squared_error(self) -> float:
+        """ Squared error of partition with all set sums differing at most by one """
+        r = self.total % self.m
+        return r * (self.m - r) / self.m
+
+    @property
+    def lower_bound(self) -> float:
+        """ Lower bound of the largest set sum """
+        return max(self.perfect, self.max)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("Instance is read-only.")
+
+    def __copy__(self) -> Instance:
+        return self
+
+    def __deepcopy__(self, memo) -> Instance:
+        return self
+
+    def __reduce__(self):
+        if isinstance(self.values, np.memmap) and self.values.filename is not None \
+                and getattr(self.values, '_mmap') is not None:
+            return _mapped_instance, (self.values.filename, _file_offset(self.values), self.n, self.m)
+        return Instance, (self.values, self.m)
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __getitem__(self, i):
+        return self.values[i]
+
+    def __iter__(self) -> Iterator[Elem_T]:
+        return iter(self.values.tolist())
+
+    def __repr__(self):
+        return f"Instance(n={self.n}, m={self.m}, total={self.total})"
+
+
+def _file_offset(values: np.memmap) -> int:
+    """
+    Byte offset of the first value in the mapped file. Slices of memmap keep
+    offset of the whole mapping, so it is restored from the address in the mapping
+    (numpy maps file from offset rounded down to allocation granularity).
+    """
+    start = values.offset - values.offset % mmap.ALLOCATIONGRANULARITY
+    base = np.frombuffer(getattr(values, '_mmap'), dtype=np.uint8).ctypes.data
+    return start + values.ctypes.data - base
+
+
+def _mapped_instance(filename: str, offset: int, n: int, m: int) -> Instance:
+    """ Instance over memory mapped values, used to pass them to other processes without copying """
+    return Instance(np.memmap(filename, dtype=np.int64, mode='r', offset=offset, shape=(n,)), m)
+
+
+class IndexedHeap:
+    """ Binary heap over int keys of items 0..k-1, top is the item with the least key, any key is updated in O(log k) """
+    __slots__ = ('keys', 'heap', 'positions')
+
+    def __init__(self, keys: Iterable[int]):
+        self.keys = list(keys)
+        self.heap = sorted(range(len(self.keys)), key=self.keys.__getitem__)
+        self.positions = [0] * len(self.heap)
+        for p, j in enumerate(self.heap):
+            self.positions[j] = p
+
+    @property
+    def top(self) -> int:
+        return self.heap[0]
+
+    def update(self, j: int, key: int) -> None:
+        keys, heap, positions = self.keys, self.heap, self.positions
+        old, keys[j] = keys[j], key
+        p = positions[j]
+        if key < old:
+            while p:
+                parent = (p - 1) >> 1
+                q = heap[parent]
+                if key >= keys[q]:
+                    break
+                heap[p] = q
+                positions[q] = p
+                p = parent
+        else:
+            size = len(heap)
+            child = 2 * p + 1
+            while child < size:
+                q = heap[child]
+                if child + 1 < size and keys[heap[child + 1]] < keys[q]:
+                    child += 1
+                    q = heap[child]
+                if keys[q] >= key:
+                    break
+                heap[p] = q
+                positions[q] = p
+                p = child
+                child = 2 * p + 1
+        heap[p] = j
+        positions[j] = p
+
+    def __copy__(self) -> IndexedHeap:
+        obj = IndexedHeap.__new__(IndexedHeap)
+        obj.keys, obj.heap, obj.positions = list(self.keys), list(self.heap), list(self.positions)
+        return obj
 
 
 class PartialSolution:
     """ Structure to contain a partial solution of MNP """
+    __slots__ = (
+        'instance', 'n', 'm', '_total', 'perfect',
+        'partitioning', 'sums', '_sq_dev', '_abs_dev', '_journal', '_hash',
+        '_members', '_positions', '_heaps',
+    )
+
     def __init__(self, data: Instance_T, m=2):
-        self.n = len(data)
+        self.instance = Instance.create(data, m)  # Link on data
+        self.n = self.instance.n
         self.m = m
-        self.perfect = self.get_perfect(data, m)
-        self.cost = data  # Link on data
-        assert self.m < (1 << 7), "Number of sets is too high"
-        self.partitioning = np.full(self.n, m, dtype=np.uint)
+        self._total = self.instance.total
+        self.perfect = self.instance.perfect
+        assert self.m < (1 << 16), "Number of sets is too high"
+        # value m marks unassigned item
+        self.partitioning = np.full(self.n, m, dtype=self.partitioning_dtype(m))
         self.sums = np.zeros(self.m, dtype=int)
+        # Errors are kept scaled by m to stay integer: dev_j = m * sums[j] - total
+        self._sq_dev = m * self._total ** 2
+        self._abs_dev = m * abs(self._total)
+        self._journal: Optional[MoveRecord] = None
+        # Zobrist hash of partitioning, computed on first use and then updated per move
+        self._hash: Optional[int] = None
+        # Optional membership index: items of every set and position of item in its list
+        self._members: Optional[List[List[int]]] = None
+        self._positions: Optional[List[int]] = None
+        # Optional (min, max) heaps over set sums
+        self._heaps: Optional[Tuple[IndexedHeap, IndexedHeap]] = None
+
+    @staticmethod
+    def partitioning_dtype(m: int) -> np.dtype:
+        """ Smallest unsigned type that holds set indices 0..m """
+        return np.dtype(np.uint8 if m < (1 << 8) else np.uint16)
+
+    def __copy__(self) -> PartialSolution:
+        obj = PartialSolution.__new__(PartialSolution)
+        for key in self.__slots__:
+            setattr(obj, key, getattr(self, key))
+        obj.partitioning = self.partitioning.copy()
+        obj.sums = self.sums.copy()
+        obj._journal = None
+        if self._members is not None:
+            assert self._positions is not None
+            obj._members = [list(members) for members in self._members]
+            obj._positions = list(self._positions)
+        if self._heaps is not None:
+            obj._heaps = (copy.copy(self._heaps[0]), copy.copy(self._heaps[1]))
+        return obj
+
+    def __deepcopy__(self, memo) -> PartialSolution:
+        return self.__copy__()
+
+    @property
+    def cost(self) -> np.ndarray:
+        return self.instance.values
 
     def cost_item(self, i: int) -> int:
         return self.cost[i]
@@ -40,30 +295,155 @@ class PartialSolution:
                 obj.put_item(i, j)
         return obj
 
-    def find_item(self, i: int) -> Optional[int]:
-        return self.partitioning[i]
+    @staticmethod
+    def from_partitioning(data: Instance_T, m: int, partitioning: np.ndarray) -> PartialSolution:
+        """ Builds solution from array of set indices (one per item) """
+        obj = PartialSolution(data, m=m)
+        obj.partitioning[:] = partitioning
+        obj.recalculate_sums()
+        return obj
+
+    def find_item(self, i: int) -> int:
+        """ Set of i-th item, m if it is unassigned """
+        return self.partitioning.item(i)
+
+    def _dev(self, j: int) -> int:
+        return self.m * int(self.sums[j]) - self._total
+
+    def _shift_sum(self, j: int, value: int) -> None:
+        """ Adds value to j-th set sum, errors are updated in O(1) """
+        old = self._dev(j)
+        new = old + self.m * value
+        self._sq_dev += new * new - old * old
+        self._abs_dev += abs(new) - abs(old)
+        self.sums[j] += value
+        if self._heaps is not None:
+            # (sum, j) pairs packed into ints: the first of equal sums is on top
+            s = self.sums.item(j) * self.m
+            self._heaps[0].update(j, s + j)
+            self._heaps[1].update(j, j - s)
 
     def reset_item(self, i: int) -> None:
         j = self.find_item(i)
         if j != self.m:
+            if self._journal is not None:
+                self._journal.append((i, j, self.m))
             self.partitioning[i] = self.m
-            self.sums[j] -= self.cost[i]
+            self._shift_sum(j, -int(self.cost[i]))
+            if self._members is not None:
+                self._remove_member(i, j)
+            if self._hash is not None:
+                self._hash ^= self._hash_key(i, j) ^ self._hash_key(i, self.m)
 
     def put_item(self, i: int, j: int) -> None:
-        self.reset_item(i)
+        s_idx = self.find_item(i)
+        if self._journal is not None:
+            self._journal.append((i, s_idx, j))
+        c = int(self.cost[i])
+        if s_idx != self.m:
+            self._shift_sum(s_idx, -c)
         self.partitioning[i] = j
-        self.sums[j] += self.cost[i]
+        self._shift_sum(j, c)
+        if self._members is not None and s_idx != j:
+            assert self._positions is not None
+            if s_idx != self.m:
+                self._remove_member(i, s_idx)
+            self._positions[i] = len(self._members[j])
+            self._members[j].append(i)
+        if self._hash is not None:
+            self._hash ^= self._hash_key(i, s_idx) ^ self._hash_key(i, j)
+
+    def _remove_member(self, i: int, j: int) -> None:
+        """ Removes i from members of j-th set in O(1): the last member takes its place """
+        assert self._members is not None and self._positions is not None
+        members = self._members[j]
+        last = members.pop()
+        if last != i:
+            members[self._positions[i]] = last
+            self._positions[last] = self._positions[i]
+
+    def build_index(self) -> None:
+        """ Starts keeping items of every set, so members of set are got without scan of partitioning """
+        self._members = [[] for _ in range(self.m)]
+        self._positions = [0] * self.n
+        for i, j in enumerate(self.partitioning.tolist()):
+            if j != self.m:
+                self._positions[i] = len(self._members[j])
+                self._members[j].append(i)
+
+    def build_heaps(self) -> None:
+        """
+        Starts keeping heaps over set sums, so argmin_sum and argmax_sum are O(1)
+        and every sum update is O(log m). Opt-in: each put_item then sifts both heaps
+        in Python, which costs about as much as np.argmin over the largest
+        supported m (< 2^16), so solvers do not build heaps.
+        """
+        sums = self.sums.tolist()
+        self._heaps = (
+            IndexedHeap(s * self.m + j for j, s in enumerate(sums)),
+            IndexedHeap(j - s * self.m for j, s in enumerate(sums)),
+        )
+
+    def argmin_sum(self) -> int:
+        """ Set with the least sum, the first one of equal (as np.argmin) """
+        if self._heaps is not None:
+            return self._heaps[0].top
+        return int(np.argmin(self.sums))
+
+    def argmax_sum(self) -> int:
+        """ Set with the greatest sum, the first one of equal (as np.argmax) """
+        if self._heaps is not None:
+            return self._heaps[1].top
+        return int(np.argmax(self.sums))
+
+    @property
+    def indexed(self) -> bool:
+        return self._members is not None
+
+    def start_journal(self) -> None:
+        """ Starts recording of all item moves """
+        self._journal = []
+
+    def stop_journal(self) -> MoveRecord:
+        """ Stops recording and returns recorded moves """
+        record, self._journal = self._journal or [], None
+        return record
+
+    def undo(self, record: MoveRecord) -> None:
+        """ Reverts moves of the record inplace """
+        journal, self._journal = self._journal, None
+        for i, old, _ in reversed(record):
+            if old == self.m:
+                self.reset_item(i)
+            else:
+                self.put_item(i, old)
+        self._journal = journal
 
     def recalculate_sums(self) -> None:
+        self._hash = None
+        assigned = self.partitioning < self.m
         self.sums = np.zeros(self.m, dtype=int)
-        for i, x in enumerate(self.cost):
-            j = self.find_item(i)
-            if j is not None:
-                self.sums[j] += x
+        np.add.at(self.sums, self.partitioning[assigned], self.cost[assigned])
+        devs = [self._dev(j) for j in range(self.m)]
+        self._sq_dev = sum(d * d for d in devs)
+        self._abs_dev = sum(abs(d) for d in devs)
+        if self._members is not None:
+            self.build_index()
+        if self._heaps is not None:
+            self.build_heaps()
 
     def get_index_list(self, j: int) -> np.ndarray:
+        """ Items of j-th set, in arbitrary order if index is built """
+        if self._members is not None:
+            return np.array(self._members[j], dtype=np.intp)
         return np.where(self.partitioning == j)[0]
 
+    def random_item(self, j: int) -> int:
+        """ Random item of non-empty j-th set, O(1) if index is built """
+        if self._members is not None:
+            return random.choice(self._members[j])
+        return int(random.choice(self.get_index_list(j)))
+
     @staticmethod
     def get_perfect(data: Instance_T, m: int) -> float:
         return sum(data) / m
@@ -74,29 +454,28 @@ class PartialSolution:
 
     @property
     def squared_error(self) -> float:
-        return self._squared_error(self.sums, self.perfect)
+        return self._sq_dev / self.m ** 2
 
     @property
     def abs_error(self) -> float:
-        return sum(np.abs(self.sums - self.perfect))
+        return self._abs_dev / self.m
 
     @property
     def is_full(self) -> bool:
-        return all(x is not None for x in self.partitioning)
+        return bool(np.all(self.partitioning < self.m))
 
     @property
     def solution(self) -> List[List[Elem_T]]:
         if not self.is_full:
             raise RuntimeError("Partial solution is not complete, can't construct solution.")
+        return self._sets()
 
-        return [
-            [
-                self.cost[i]
-                for i in range(self.n)
-                if self.partitioning[i] == j
-            ]
-            for j in range(self.m)
-        ]
+    def _sets(self) -> List[List[Elem_T]]:
+        """ Values of every set, unassigned items are left out """
+        # one stable sort instead of scan of partitioning for every set
+        order = np.argsort(self.partitioning, kind='stable')
+        bounds = np.cumsum(np.bincount(self.partitioning, minlength=self.m + 1))[:-1]
+        return [part.tolist() for part in np.split(self.cost[order], bounds)][:self.m]
 
     def __eq__(self, other: PartialSolution) -> bool:
         if not isinstance(other, PartialSolution):
@@ -107,25 +486,34 @@ class PartialSolution:
             and np.array_equal(self.partitioning, other.partitioning)
         )
 
+    def _hash_key(self, i: int, j: int) -> int:
+        return _splitmix64(self.instance.zobrist.item(i) ^ j)
+
+    @property
+    def zobrist_hash(self) -> int:
+        """ 64-bit Zobrist hash of partitioning, O(1) after the first call """
+        if self._hash is None:
+            keys = _splitmix64_array(self.instance.zobrist ^ self.partitioning.astype(np.uint64))
+            self._hash = int(np.bitwise_xor.reduce(keys)) if self.n else 0
+        return self._hash
+
     def __hash__(self):
-        return hash(self.partitioning.tobytes())
+        return hash(self.zobrist_hash)
 
-    def hash_put(self, i: int, j: int):
-        s_idx = self.find_item(i)
-        self.put_item(i, j)
-        hs = hash(self)
-        self.put_item(i, s_idx)
-        return hs
-
-    def hash_swap(self, i: int, j: int):
-        i_idx = self.find_item(i)
-        j_idx = self.find_item(j)
-        self.put_item(i, j_idx)
-        self.put_item(j, i_idx)
-        hs = hash(self)
-        self.put_item(i, i_idx)
-        self.put_item(j, j_idx)
-        return hs
+    def hash_moves(self, moves: Iterable[Tuple[int, int]]) -> int:
+        """ Zobrist hash of solution with (item, set) puts applied, items must be distinct """
+        h = self.zobrist_hash
+        for i, j in moves:
+            h ^= self._hash_key(i, self.find_item(i)) ^ self._hash_key(i, j)
+        return h
+
+    def hash_put(self, i: int, j: int) -> int:
+        """ Zobrist hash of solution with i-th item put to j-th set """
+        return self.hash_moves(((i, j),))
+
+    def hash_swap(self, i: int, j: int) -> int:
+        """ Zobrist hash of solution with i-th and j-th items swapped between their sets """
+        return self.hash_moves(((i, self.find_item(j)), (j, self.find_item(i))))
 
     @staticmethod
     def get_sum_hash(sums: np.ndarray):
@@ -135,23 +523,65 @@ class PartialSolution:
     def sums_hash(self):
         return self.get_sum_hash(self.sums)
 
-    def delta_put(self, i: int, j: int):
-        sum_copy = self.sums.copy()
+    def delta_put(self, i: int, j: int) -> float:
+        """ Decrease of squared error if i-th item is put to j-th set """
         s_idx = self.find_item(i)
-        if s_idx:
-            sum_copy[s_idx] -= self.cost[i]
-        sum_copy[j] += self.cost[i]
-        return self.squared_error - self._squared_error(sum_copy, self.perfect)
-
-    def delta_swap(self, i_1: int, i_2: int):
+        if s_idx == j:
+            return 0.
+        c = self.m * int(self.cost[i])
+        d_j = self._dev(j)
+        gain = d_j * d_j - (d_j + c) ** 2
+        if s_idx != self.m:
+            d_s = self._dev(s_idx)
+            gain += d_s * d_s - (d_s - c) ** 2
+        return gain / self.m ** 2
+
+    def delta_swap(self, i_1: int, i_2: int) -> float:
+        """ Decrease of absolute error if items i_1 and i_2 swap their sets """
         set_1 = self.find_item(i_1)
         set_2 = self.find_item(i_2)
-        return (
-            abs(self.sums[set_1] - self.perfect)
-            + abs(self.sums[set_2] - self.perfect)
-            - abs(self.sums[set_1] - self.cost[i_1] + self.cost[i_2] - self.perfect)
-            - abs(self.sums[set_2] - self.cost[i_2] + self.cost[i_1] - self.perfect)
-        )
+        if set_1 == set_2:
+            return 0.
+        c = self.m * (int(self.cost[i_1]) - int(self.cost[i_2]))
+        d_1 = self._dev(set_1)
+        d_2 = self._dev(set_2)
+        return (abs(d_1) + abs(d_2) - abs(d_1 - c) - abs(d_2 + c)) / self.m
+
+    @property
+    def deviations(self) -> np.ndarray:
+        """ Deviations of set sums from perfect one scaled by m: m * sums - total """
+        return self.m * self.sums.astype(np.float64) - self._total
+
+    def delta_put_all(self) -> np.ndarray:
+        """ delta_put for every (item, set) pair as (n, m) array """
+        dev = self.deviations
+        c = self.m * self.cost.astype(np.float64)
+        assigned = self.partitioning < self.m
+        leave = np.where(assigned, 2 * c * dev[np.minimum(self.partitioning, self.m - 1)] - c * c, 0.)
+        gains = (leave - c * c)[:, None] - 2 * c[:, None] * dev[None, :]
+        items = np.flatnonzero(assigned)
+        gains[items, self.partitioning[items]] = 0.
+        return gains / self.m ** 2
+
+    def delta_swap_pairs(self, items_1: np.ndarray, items_2: np.ndarray, squared: bool = False) -> np.ndarray:
+        """
+        delta_swap for pairs (items_1[k], items_2[k]), index arrays are broadcast,
+        with squared=True decrease of squared error is returned instead
+        """
+        items_1, items_2 = np.asarray(items_1), np.asarray(items_2)
+        dev = self.deviations
+        set_1, set_2 = self.partitioning[items_1], self.partitioning[items_2]
+        d_1, d_2 = dev[set_1], dev[set_2]
+        c = self.m * (self.cost[items_1] - self.cost[items_2]).astype(np.float64)
+        if squared:
+            gains = (2 * c * (d_1 - d_2) - 2 * c * c) / self.m ** 2
+        else:
+            gains = (np.abs(d_1) + np.abs(d_2) - np.abs(d_1 - c) - np.abs(d_2 + c)) / self.m
+        return np.where(set_1 == set_2, 0., gains)
+
+    def delta_swap_all(self, items_1: np.ndarray, items_2: np.ndarray, squared: bool = False) -> np.ndarray:
+        """ delta_swap_pairs for every pair of items_1 and items_2 as 2d array, takes O(|items_1| |items_2|) memory """
+        return self.delta_swap_pairs(np.asarray(items_1)[:, None], np.asarray(items_2)[None, :], squared)
 
     @staticmethod
     def nested_list_to_str(sol: Solution_T):
@@ -166,18 +596,136 @@ class PartialSolution:
         return f"Statistics for partial solution {id(self)}.\n"\
                f"IS_FULL:{self.is_full}\n"\
                f"SETS:\n"\
-               f"{self.nested_list_to_str(self.solution)}\n"\
+               f"{self.nested_list_to_str(self._sets())}\n"\
                f"Diffs: {self.sums - self.perfect}\n" \
                f"Sum Abs Errors: {self.abs_error}\n" \
                f"STD: {np.std(self.sums - self.perfect)}\n"
 
 
+class TabuList:
+    """ Set of solution hashes, each hash is forgotten after ttl later additions """
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._clock = 0
+        self._expires: Dict[int, int] = {}
+        # (hash, time it expires at) in order of additions
+        self._queue: Deque[Tuple[int, int]] = deque()
+
+    def add(self, h: int) -> None:
+        self._clock += 1
+        self._expires[h] = self._clock + self.ttl
+        self._queue.append((h, self._clock + self.ttl))
+        # with ttl < 1 the hash expires at once and queue gets empty
+        while self._queue and self._queue[0][1] <= self._clock:
+            old, expires = self._queue.popleft()
+            # hash could be added again later, then it expires later
+            if self._expires.get(old) == expires:
+                del self._expires[old]
+
+    def __contains__(self, h: int) -> bool:
+        return h in self._expires
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+
+class Budget:
+    """
+    Stopping rule for anytime solving.
+
+    :param time_limit - seconds to solve since budget creation;
+    :param deadline - absolute time (time.time()) to stop at;
+    :param callback - called with every new incumbent, returns True to stop solving;
+    """
+
+    def __init__(
+        self,
+        time_limit: Optional[float] = None,
+        deadline: Optional[float] = None,
+        callback: Optional[Callable[[PartialSolution], bool]] = None,
+    ):
+        if time_limit is not None:
+            limit = time.time() + time_limit
+            deadline = limit if deadline is None else min(deadline, limit)
+        self.deadline = deadline
+        self.callback = callback
+        self.iterations = 0
+        self.stopped = False
+
+    @property
+    def remaining(self) -> Optional[float]:
+        """ Seconds left till deadline """
+        if self.deadline is None:
+            return None
+        return max(0., self.deadline - time.time())
+
+    def tick(self) -> bool:
+        """ Counts one iteration, returns True if solving must stop """
+        self.iterations += 1
+        if self.deadline is not None and time.time() >= self.deadline:
+            self.stopped = True
+        return self.stopped
+
+    def improved(self, ps: PartialSolution) -> bool:
+        """ Reports new incumbent, returns True if solving must stop """
+        if self.callback is not None and self.callback(ps):
+            self.stopped = True
+        return self.stopped
+
+
 class AbstractSolver(metaclass=ABCMeta):
     """ Base class for all algorithms solving MNP """
+
+    # solver returns the same solution on every run, so it is never restarted
+    deterministic = False
+    # counters and phase timers are reported here, set Recorder instance to collect them
+    recorder = NULL_RECORDER
+
     @abstractmethod
     def solve(self, data: Instance_T, m: int) -> PartialSolution:
         raise NotImplementedError
 
+    def iter_solve(
+        self, data: Instance_T, m: int, budget: Optional[Budget] = None,
+    ) -> Iterator[PartialSolution]:
+        """
+        Yields solutions as they improve until budget is exhausted.
+        By default solver can't be interrupted and yields result of solve.
+        """
+        ps = self.solve(data, m)
+        if budget is not None:
+            budget.tick()
+            budget.improved(ps)
+        yield ps
+
+
+class AnytimeSolver(AbstractSolver, metaclass=ABCMeta):
+    """ Base class for solvers that stop on Budget and report their incumbents """
+
+    def solve(self, data: Instance_T, m: int, budget: Optional[Budget] = None) -> PartialSolution:
+        ps = None
+        for ps in self.iter_solve(data, m, budget):
+            pass
+        assert ps is not None, "iter_solve must yield at least one solution"
+        return ps
+
+    @abstractmethod
+    def iter_solve(
+        self, data: Instance_T, m: int, budget: Optional[Budget] = None,
+    ) -> Iterator[PartialSolution]:
+        raise NotImplementedError
+
+
+class LocalSearch(AnytimeSolver, metaclass=ABCMeta):
+    """ Base class for algorithms improving starting solution `ps` """
+    ps: PartialSolution
+
+    def restarted(self, ps: PartialSolution) -> LocalSearch:
+        """ Copy of algorithm that starts from another solution """
+        obj = copy.copy(self)
+        obj.ps = copy.deepcopy(ps)
+        return obj
+
 
-class LocalSearch(AbstractSolver, metaclass=ABCMeta):
-    pass
+# builds solver for instance and number of sets, local searches get their start solutions here
+SolverFactory = Callable[[Instance, int], AbstractSolver]
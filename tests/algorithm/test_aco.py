@@ -0,0 +1,51 @@
+import numpy as np
+
+from algorithm import ant_colony_optimization
+from algorithm.ant_colony_optimization import ACO, _build_ants
+from core import Instance
+
+
+def test_ant_buckets():
+    data = Instance([7, 3, 9, 1, 5, 4, 8, 2], 3)
+    aco = ACO(ants_n=4, buckets=4)
+    aco._reset_pheromones(data.n, 3)
+    labels, buckets, sums = aco._one_iteration(data, 3, 4, np.random.default_rng(0))
+
+    means = np.concatenate(([0], np.cumsum(data.values)[:-1])) / 3
+    widths = np.maximum(np.round(means * 2 / 4), 1)
+    for k in range(4):
+        loads = np.zeros(3, dtype=int)
+        for i, j in enumerate(labels[k]):
+            assert buckets[k, i] == min(loads[j] // widths[i], 3)
+            loads[j] += data[i]
+        assert np.array_equal(loads, sums[k])
+
+
+def test_aco():
+    data = [8, 7, 6, 5, 4, 3, 2, 1]
+    np.random.seed(0)
+    ps = ACO(ants_n=20, max_iter=50, seed=0).solve(data, 2)
+    assert ps.is_full
+    assert np.array_equal(ps.sums, [sum(s) for s in ps.solution])
+    assert ps.abs_error == 0
+
+
+def test_parallel_aco():
+    data = list(range(1, 30))
+    results = []
+    for pool in ('thread', 'thread', 'process'):
+        np.random.seed(0)
+        ps = ACO(ants_n=30, max_iter=5, seed=3, workers=3, pool=pool).solve(data, 3)
+        assert ps.is_full
+        results.append(ps.partitioning.tolist())
+    assert results[0] == results[1] == results[2]
+
+
+def test_noise_chunks(monkeypatch):
+    data = Instance(list(range(1, 30)), 3)
+    log_pheromones = np.log(np.random.default_rng(0).uniform(0.1, 1, (data.n, 3, 4)))
+    whole = _build_ants(data, 3, 5, log_pheromones, np.random.default_rng(1))
+    monkeypatch.setattr(ant_colony_optimization, '_NOISE_CHUNK', 40)
+    chunked = _build_ants(data, 3, 5, log_pheromones, np.random.default_rng(1))
+    for a, b in zip(whole, chunked):
+        assert np.array_equal(a, b)
@@ -0,0 +1,58 @@
+import io
+import json
+
+import numpy as np
+import pytest
+
+from algorithm import SimulatedAnnealing, temperature_div
+from algorithm.batch import BatchSolver
+from algorithm.greedy import GreedySolver
+from core import GlobSource, RandomMover, greedy_transp_one, max_to_min, write_binary
+
+
+def test_batch_glob(tmp_path):
+    rng = np.random.default_rng(0)
+    instances = {}
+    for k in range(7):
+        values = rng.integers(1, 100, 10 + k)
+        if k % 2:
+            path = tmp_path / 'nested' / f'{k}.wm'
+            path.parent.mkdir(exist_ok=True)
+            path.write_text('{' + ', '.join(map(str, values)) + '}\n')
+        else:
+            path = tmp_path / f'{k}.bin'
+            write_binary(str(path), values)
+        instances[str(path)] = values.tolist()
+
+    source = GlobSource(str(tmp_path / '**' / '*.*'), queue_size=2)
+    assert [path for path, _ in source] == sorted(instances)
+
+    output = io.StringIO()
+    assert BatchSolver(GreedySolver(), 3, processes=2, max_pending=2).run(source, output) == 7
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert sorted(r['path'] for r in results) == sorted(instances)
+    for r in results:
+        expected = GreedySolver().solve(instances[r['path']], 3)
+        assert r['partitioning'] == expected.partitioning.tolist()
+        assert r['squared_error'] == expected.squared_error
+
+
+def test_batch_factory_and_errors(tmp_path):
+    for k, values in enumerate([[8, 7, 6, 5, 4], [30, 1, 2, 3, 4, 5, 6, 9]]):
+        (tmp_path / f'{k}.txt').write_text(' '.join(map(str, values)))
+    (tmp_path / '2.txt').write_text('1 2 x')
+
+    def factory(instance, m):
+        return SimulatedAnnealing(
+            GreedySolver().solve(instance, m), RandomMover([greedy_transp_one, max_to_min]),
+            temperature_div, max_iter=100,
+        )
+
+    with pytest.raises(ValueError):
+        BatchSolver(factory(GreedySolver().solve([1, 2], 2).instance, 2), 2)
+    output = io.StringIO()
+    source = GlobSource(str(tmp_path / '*.txt'), errors='return')
+    assert BatchSolver(factory, 2, processes=1).run(source, output) == 2
+    results = {r['path']: r for r in map(json.loads, output.getvalue().splitlines())}
+    assert 'error' in results[str(tmp_path / '2.txt')]
+    assert [sum(results[str(tmp_path / f'{k}.txt')]['sums']) for k in range(2)] == [30, 60]
@@ -0,0 +1,65 @@
+from itertools import product
+
+import pytest
+
+from algorithm.dynamic import Dynamic2MNP, Dynamic2Solver, DynamicSolver
+
+
+def _best_diff(data):
+    return min(
+        abs(sum(x for x, side in zip(data, sides) if side) * 2 - sum(data))
+        for sides in product((0, 1), repeat=len(data))
+    )
+
+
+@pytest.mark.parametrize(
+    'data',
+    [
+        [1, 3, 2],
+        [1, 3, 2, 1],
+        [1, 3, 5, 1],
+        [1, 2, 3, 4, 5, 6, 7],
+        [0, 9, 14, 27, 3, 8, 8, 1],
+        [100, 1, 3, 2],
+        [7],
+    ]
+)
+def test_dynamic_2(data):
+    best = _best_diff(data)
+    assert Dynamic2MNP(data) == (best == 0)
+    ps = Dynamic2Solver().solve(data, 2)
+    assert ps.is_full
+    assert abs(ps.sums[0] - ps.sums[1]) == best
+
+
+def _best_squared_error(data, m):
+    mean = sum(data) / m
+    best = float('inf')
+    for labels in product(range(m), repeat=len(data)):
+        sums = [0] * m
+        for x, j in zip(data, labels):
+            sums[j] += x
+        best = min(best, sum((s - mean) ** 2 for s in sums))
+    return best
+
+
+@pytest.mark.parametrize(
+    'data, m',
+    [
+        ([4, 5, 6, 7, 8], 3),
+        ([1, 3, 5, 1, 7, 9, 2, 2], 3),
+        ([10, 13, 1, 7, 7, 8, 3], 4),
+        ([0, 9, 14, 27, 3, 8], 2),
+    ]
+)
+def test_dynamic_m(data, m):
+    ps = DynamicSolver().solve(data, m)
+    assert ps.is_full
+    assert ps.squared_error == pytest.approx(_best_squared_error(data, m))
+
+
+def test_dynamic_fallback():
+    data = [3, 17, 25, 6, 11, 19, 40, 2]
+    ps = DynamicSolver(max_states=5).solve(data, 3)
+    assert ps.is_full
+    assert sum(ps.sums) == sum(data)
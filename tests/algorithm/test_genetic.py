@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from algorithm.genetic import BatchGeneticAlgorithm, HalfCrossover, ParallelGenetic, Population
+from core import Instance, RandomMover, greedy_transp_one, max_to_min
+
+
+def test_population_sums():
+    pop = Population(Instance([3, 5, 11, 7], 2), np.array([[0, 0, 1, 1], [1, 1, 1, 0]], dtype=np.uint8))
+    assert np.array_equal(pop.sums, [[8, 18], [7, 19]])
+    assert np.array_equal(pop.errors, [10, 12])
+
+    rng = np.random.default_rng(0)
+    mutants = pop.mutate(np.array([0, 1, 1]), 3, rng)
+    assert np.array_equal(mutants.sums, mutants.calculate_sums(mutants.partitioning))
+    children = pop.half_cross(np.array([0]), np.array([1]))
+    assert np.array_equal(children.partitioning, [[0, 0, 1, 0]])
+    assert np.array_equal(children.sums, [[15, 11]])
+
+
+def test_batch_genetic():
+    data = [8, 7, 6, 5, 4, 3, 2, 1]
+    ps = BatchGeneticAlgorithm(
+        population_size=50, max_iter=30, mutations_n=20, crossover_n=10,
+        old_livers_n=5, elite_n=10, selection_n=20, seed=1,
+    ).solve(data, 2)
+    assert ps.is_full
+    assert np.array_equal(ps.sums, [sum(s) for s in ps.solution])
+    assert ps.abs_error == 0
+
+
+def test_parallel_genetic_islands():
+    data = [8, 7, 6, 5, 4, 3, 2, 1]
+    params = dict(
+        crossover=HalfCrossover(), mutation=RandomMover([greedy_transp_one, max_to_min]),
+        population_size=20, max_iter=6, mutations_n=6, crossover_n=4,
+        old_livers_n=2, elite_n=4, selection_n=10, experiments_n=3,
+        migration_interval=2, topology='full', seed=3,
+    )
+    ps = ParallelGenetic(**params).solve(data, 2)
+    assert ps.is_full
+    assert ps.abs_error == ParallelGenetic(**params).solve(data, 2).abs_error
+
+
+def _failing_move(ps, **_):
+    raise ValueError("broken mutation")
+
+
+def test_parallel_genetic_failure():
+    params = dict(
+        crossover=HalfCrossover(), mutation=RandomMover([_failing_move]),
+        population_size=20, max_iter=6, mutations_n=6, crossover_n=4,
+        old_livers_n=2, elite_n=4, selection_n=10, experiments_n=3,
+    )
+    with pytest.raises(RuntimeError, match="broken mutation"):
+        ParallelGenetic(**params).solve([8, 7, 6, 5, 4, 3, 2, 1], 2)
+    with pytest.raises(ValueError):
+        ParallelGenetic(**params, migration_interval=0)
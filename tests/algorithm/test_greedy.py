@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 import logging
 
@@ -26,3 +27,13 @@ def test_greedy_trivial(instance, expected):
     solution = GreedySolver().solve(ext_s_one.get_data(), 2).solution
     assert solution == expected
 
+
+def test_greedy_many():
+    rng = np.random.default_rng(0)
+    instances = [rng.integers(0, 20, size).tolist() for size in (5, 1, 0, 12, 7)]
+    offsets = np.cumsum([0] + [len(x) for x in instances])
+    partitioning, sums = GreedySolver.solve_many(np.concatenate(instances), offsets, 3)
+    for k, instance in enumerate(instances):
+        ps = GreedySolver().solve(instance, 3)
+        assert np.array_equal(partitioning[offsets[k]:offsets[k + 1]], ps.partitioning)
+        assert np.array_equal(sums[k], ps.sums)
@@ -1,4 +1,6 @@
-from karmarkar_karp import _PartialSet
+from heapq import heappop, heappush
+
+from algorithm.karmarkar_karp import CompleteKarmarkarKarp, KarmarkarKarp, _PartialSet
 
 
 def test_partial():
@@ -21,3 +23,31 @@ def test_partial():
     assert p1.sets == [[10, 7], [5, 15], [20]]
     assert p1.errors == [0, 3, 3]
 
+
+def test_ckk_optimal():
+    data = [8, 7, 6, 5, 4]
+    assert KarmarkarKarp().solve(data, 2).abs_error == 2
+    ps = CompleteKarmarkarKarp().solve(data, 2)
+    assert ps.abs_error == 0
+    assert ps.cost.tolist() == data
+    assert [sum(x for x, j in zip(data, ps.partitioning) if j == k) for k in range(2)] == [15, 15]
+
+    data = [27, 24, 19, 17, 13, 11, 8, 5, 3, 1, 1]
+    kk = KarmarkarKarp().solve(data, 3)
+    incumbents = list(CompleteKarmarkarKarp().iter_solve(data, 3))
+    assert sorted(incumbents[0].sums) == sorted(kk.sums)
+    assert max(incumbents[-1].sums) - min(incumbents[-1].sums) <= 1
+
+
+def test_kk_matches_partial_sets():
+    data = [31, 4, 15, 92, 65, 35, 89, 79, 32, 38, 46, 26, 43]
+    for m in (2, 3, 4):
+        queue = []
+        for x in data:
+            heappush(queue, _PartialSet(m=m, first_element=x))
+        while len(queue) > 1:
+            heappush(queue, heappop(queue) | heappop(queue))
+
+        ps = KarmarkarKarp().solve(data, m)
+        assert ps.is_full
+        assert sorted(ps.sums) == sorted(sum(x) for x in queue[0].sets)
@@ -0,0 +1,69 @@
+import time
+
+from algorithm import (
+    ACO, GreedySolver, KarmarkarKarp, PortfolioSolver, RandomSolver, SimulatedAnnealing, temperature_div,
+)
+from core import Budget, RandomMover, PartialSolution, greedy_transp_one, max_to_min
+
+
+def test_portfolio():
+    data = [19, 17, 13, 11, 7, 5, 3, 2, 2, 1]
+    start = GreedySolver().solve(data, 3)
+    portfolio = PortfolioSolver(
+        [
+            GreedySolver(),
+            KarmarkarKarp(),
+            SimulatedAnnealing(
+                start, move=RandomMover([greedy_transp_one, max_to_min]),
+                temperature_func=temperature_div, max_iter=200,
+            ),
+        ],
+        restarts=3,
+        processes=2,
+        seed=0,
+    )
+    ps = portfolio.solve(data, 3)
+    assert isinstance(ps, PartialSolution) and ps.is_full
+    assert ps.squared_error <= start.squared_error
+    assert portfolio.stats['GreedySolver']['runs'] + portfolio.stats['GreedySolver']['skipped'] == 1
+    assert sum(s['runs'] + s['skipped'] for s in portfolio.stats.values()) == 5
+    assert min(s['best'] for s in portfolio.stats.values()) == ps.squared_error
+
+
+def test_anytime_stops_on_callback():
+    data = [19, 17, 13, 11, 7, 5, 3, 2, 2, 1]
+    start = RandomSolver().solve(data, 3)
+    sa = SimulatedAnnealing(
+        start, move=RandomMover([greedy_transp_one, max_to_min]),
+        temperature_func=temperature_div, max_iter=10 ** 6,
+    )
+    incumbents = list(sa.iter_solve(data, 3, Budget(callback=lambda ps: True)))
+    assert incumbents == [start]
+
+    budget = Budget(time_limit=0.2)
+    ps = sa.solve(data, 3, budget)
+    assert ps.squared_error <= start.squared_error
+    assert 0 < budget.iterations < 10 ** 6
+
+
+def test_portfolio_stops_workers():
+    data = list(range(1, 40))
+    sa = SimulatedAnnealing(
+        GreedySolver().solve(data, 3), move=RandomMover([greedy_transp_one, max_to_min]),
+        temperature_func=temperature_div, max_iter=10 ** 8,
+    )
+    portfolio = PortfolioSolver([GreedySolver(), sa], restarts=1, processes=2)
+    start = time.time()
+    # the first finished run stops portfolio, running annealing must stop too
+    incumbents = list(portfolio.iter_solve(data, 3, Budget(callback=lambda ps: True)))
+    assert len(incumbents) == 1
+    assert time.time() - start < 30
+
+
+def test_portfolio_seeds_solvers():
+    data = list(range(1, 30))
+    results = [
+        PortfolioSolver([ACO(ants_n=3, max_iter=2)], restarts=1, processes=1, seed=seed).solve(data, 3)
+        for seed in (7, 7)
+    ]
+    assert results[0].partitioning.tolist() == results[1].partitioning.tolist()
@@ -0,0 +1,26 @@
+import numpy as np
+
+from algorithm import DynamicSolver
+from benchmarks import GENERATORS, ResultStore, default_solvers, planted, run_benchmarks
+
+
+def test_generators():
+    for name, generator in GENERATORS.items():
+        values = generator(50, 3, 7)
+        assert len(values) == 50 and values.min() >= 1
+        assert np.array_equal(values, generator(50, 3, 7))
+    values = planted(12, 3, 0, max_value=20)
+    assert DynamicSolver().solve(values, 3).squared_error == 0
+
+
+def test_runner_store(tmp_path):
+    solvers = {name: factory for name, factory in default_solvers().items() if name in ('greedy', 'aco')}
+    store = ResultStore(str(tmp_path / 'results.sqlite'))
+    for version in ('a', 'b'):
+        store.add(run_benchmarks(solvers, ['uniform'], [30], [2, 3], [0], time_limit=5, version=version))
+    records = store.fetch('a')
+    assert len(records) == 4
+    assert all(r['wall_time'] > 0 and r['iterations'] >= 1 and r['peak_memory'] > 0 for r in records)
+    assert {r['solver'] for r in records} == {'greedy', 'aco'}
+    assert all(r['squared_error'] >= 0 for r in records)
+    assert store.compare('a', 'b', tolerance=float('inf')) == []
@@ -1,8 +1,13 @@
+import pickle
 import pytest
 import logging
 
 from collections import deque
-from core.data_source import PythonSource
+
+import numpy as np
+
+from core.data_source import FileSource, MmapSource, PythonSource, WMFileSource, convert_to_binary
+from core.structures import Instance
 
 
 logger = logging.getLogger(__name__)
@@ -22,3 +27,47 @@ def test_python_source_id(mapper, gatherer, data, expected):
     ps = PythonSource(data, mapper=mapper, gatherer=gatherer)
     assert ps.get_data() == expected
     _iter = iter(expected)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 1 << 20])
+def test_file_source_chunks(tmp_path, chunk_size):
+    path = tmp_path / 'data.wm'
+    path.write_text('{12, 5, 300,\n 7, -4, 81}\n')
+    expected = [12, 5, 300, 7, -4, 81]
+    assert WMFileSource(str(path), chunk_size=chunk_size).get_data() == expected
+    assert WMFileSource(str(path), chunk_size=chunk_size).get_array().tolist() == expected
+
+    path.write_text('1, 2, x3\n')
+    with pytest.raises(ValueError):
+        FileSource(str(path), chunk_size=chunk_size).get_array()
+
+
+def test_binary_source(tmp_path):
+    text = tmp_path / 'data.wm'
+    text.write_text('{12, 5, 300,\n 7, 4, 81}\n')
+    binary = str(tmp_path / 'data.bin')
+    convert_to_binary(str(text), binary)
+
+    source = MmapSource(binary, verify=True)
+    values = source.get_array()
+    assert isinstance(values, np.memmap)
+    assert values.tolist() == [12, 5, 300, 7, 4, 81]
+    assert source.get_data() == [12, 5, 300, 7, 4, 81]
+
+    instance = Instance(values, 3)
+    assert instance.values is values
+    copied = pickle.loads(pickle.dumps(instance))
+    assert isinstance(copied.values, np.memmap) and copied.values.tolist() == values.tolist()
+    assert len(pickle.dumps(instance)) < len(pickle.dumps(Instance(values.tolist(), 3)))
+
+    sliced = Instance(values[2:5], 2)
+    copied = pickle.loads(pickle.dumps(sliced))
+    assert isinstance(copied.values, np.memmap) and copied.values.tolist() == [300, 7, 4]
+
+    with open(binary, 'r+b') as file:
+        file.seek(-1, 2)
+        file.write(b'\x01')
+    with pytest.raises(ValueError):
+        MmapSource(binary, verify=True)
+    with pytest.raises(ValueError):
+        MmapSource(str(text))
@@ -0,0 +1,61 @@
+import json
+
+from algorithm import GreedySolver, SimulatedAnnealing, RandomSolver, TabuSearch, temperature_div
+from algorithm.ant_colony_optimization import ACO
+from core import (
+    AbstractSolver, ConsequentMover, NULL_RECORDER, Recorder, RandomMover,
+    greedy_transp_one, max_to_min, tabu_best_move,
+)
+
+
+def test_recorder_export(tmp_path):
+    recorder = Recorder(trace=True, max_events=2)
+    for _ in range(3):
+        with recorder.phase('move'):
+            recorder.count('moves_proposed')
+    recorder.objective(5)
+
+    assert recorder.counters['moves_proposed'] == 3
+    assert len(recorder.events) == 2 and recorder.phases['move'] > 0
+
+    recorder.to_jsonl(str(tmp_path / 'run.jsonl'))
+    lines = [json.loads(line) for line in (tmp_path / 'run.jsonl').read_text().splitlines()]
+    assert {'type': 'counter', 'name': 'moves_proposed', 'value': 3} in lines
+    assert [line['value'] for line in lines if line['type'] == 'objective'] == [5.]
+
+    recorder.to_chrome_trace(str(tmp_path / 'trace.json'))
+    events = json.loads((tmp_path / 'trace.json').read_text())['traceEvents']
+    assert [e['ph'] for e in events] == ['X', 'X', 'C']
+
+
+def test_solver_recorder():
+    data = [19, 17, 13, 11, 7, 5, 3, 2, 2, 1]
+    assert AbstractSolver.recorder is NULL_RECORDER and not NULL_RECORDER.enabled
+    start = RandomSolver().solve(data, 3)
+    sa = SimulatedAnnealing(
+        start, move=RandomMover([greedy_transp_one, max_to_min]),
+        temperature_func=temperature_div, max_iter=200,
+    )
+    sa.solve(data, 3)
+
+    sa.recorder = Recorder()
+    ps = sa.solve(data, 3)
+    counters = sa.recorder.counters
+    assert counters['moves_proposed'] == counters['objective_evaluations'] > 0
+    assert counters['moves_proposed'] >= counters['moves_accepted']
+    assert set(sa.recorder.phases) <= {'move', 'evaluation', 'bookkeeping'}
+    assert [of for _, of in sa.recorder.series][-1] == ps.squared_error
+
+    aco = ACO(ants_n=5, max_iter=3, seed=0)
+    aco.recorder = Recorder()
+    aco.solve(data, 3)
+    assert aco.recorder.counters['objective_evaluations'] == 15
+    assert set(aco.recorder.phases) == {'construction', 'evaluation', 'pheromones'}
+
+    ts = TabuSearch(GreedySolver().solve(data, 3), ConsequentMover([tabu_best_move]), max_iter=5)
+    ts.recorder = Recorder()
+    ts.solve(data, 3)
+    counters = ts.recorder.counters
+    assert counters['moves_accepted'] == 5
+    assert counters['moves_proposed'] >= 5 * len(data) * 2
+    assert counters['objective_evaluations'] >= 5 * len(data) * 3
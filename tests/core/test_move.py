@@ -1,5 +1,7 @@
 import numpy as np
-from core import PartialSolution, max_to_min, greedy_transp_one
+from core import (
+    PartialSolution, ConsequentMover, TabuList, balance_swap, max_to_min, greedy_transp_one, tabu_best_move,
+)
 
 
 def test_maxtomin():
@@ -22,3 +24,73 @@ def test_greedy():
     greedy_transp_one(ps)
     assert np.array_equal(ps.get_index_list(0), [0])
     assert np.array_equal(ps.get_index_list(1), [])
+
+
+def test_move_record_undo():
+    ps = PartialSolution([4, 8, 1, 6, 3], 2)
+    for i in range(ps.n):
+        ps.put_item(i, i % 2)
+    partitioning, sums, of = ps.partitioning.copy(), ps.sums.copy(), ps.squared_error
+    record, delta = ConsequentMover([max_to_min, greedy_transp_one, max_to_min]).move_record(ps)
+    assert np.isclose(ps.squared_error - of, delta)
+    ps.undo(record)
+    assert np.array_equal(ps.partitioning, partitioning)
+    assert np.array_equal(ps.sums, sums)
+    assert ps.squared_error == of
+
+
+def test_delta_all():
+    ps = PartialSolution.from_partitioning([3, 5, 11, 2, 8, 1], 3, np.array([0, 0, 1, 2, 1, 0]))
+    puts = ps.delta_put_all()
+    for i in range(ps.n):
+        for j in range(ps.m):
+            assert np.isclose(puts[i, j], ps.delta_put(i, j))
+    items_1, items_2 = ps.get_index_list(1), ps.get_index_list(0)
+    swaps = ps.delta_swap_all(items_1, items_2)
+    squared = ps.delta_swap_all(items_1, items_2, squared=True)
+    for a, i in enumerate(items_1):
+        for b, j in enumerate(items_2):
+            assert np.isclose(swaps[a, b], ps.delta_swap(i, j))
+            of = ps.squared_error
+            ps.put_item(i, 0)
+            ps.put_item(j, 1)
+            assert np.isclose(squared[a, b], of - ps.squared_error)
+            ps.put_item(i, 1)
+            ps.put_item(j, 0)
+
+
+def test_tabu_best_move():
+    ps = PartialSolution.from_partitioning([3, 5, 11, 2, 8, 1], 2, np.zeros(6, dtype=np.uint8))
+    ps2 = PartialSolution.from_partitioning(ps.instance, 2, ps.partitioning)
+    tabu_best_move(ps)
+    assert ps.find_item(2) == 1
+
+    seen = TabuList(5)
+    seen.add(ps2.hash_put(2, 1))
+    tabu_best_move(ps2, seen=seen)
+    assert ps2.find_item(2) == 0 and ps2.squared_error < 225
+    ps3 = PartialSolution.from_partitioning(ps.instance, 2, np.zeros(6, dtype=np.uint8))
+    tabu_best_move(ps3, seen=seen, best=100)
+    assert ps3.find_item(2) == 1
+
+    seen = TabuList(0)
+    seen.add(ps.zobrist_hash)
+    assert len(seen) == 0
+
+
+def test_balance_swap():
+    rng = np.random.default_rng(0)
+    data = rng.integers(1, 1000, 40).tolist()
+    partitioning = rng.integers(0, 3, 40)
+    for two_for_one in (False, True):
+        ps = PartialSolution.from_partitioning(data, 3, partitioning)
+        p, q = np.argmax(ps.sums), np.argmin(ps.sums)
+        diff = ps.sums[p] - ps.sums[q]
+        big, small = ps.cost[ps.get_index_list(p)], ps.cost[ps.get_index_list(q)]
+        best = np.abs(diff - 2 * np.subtract.outer(big, small)).min()
+        if two_for_one:
+            pairs = np.add.outer(big, big)[np.triu_indices(len(big), 1)]
+            best = min(best, np.abs(diff - 2 * np.subtract.outer(pairs, small)).min())
+        balance_swap(ps, two_for_one=two_for_one)
+        assert ps.sums[p] - ps.sums[q] in (best, -best)
+        assert np.array_equal(ps.sums, PartialSolution.from_partitioning(data, 3, ps.partitioning).sums)
@@ -1,8 +1,9 @@
 import copy
 
 import numpy as np
+import pytest
 
-from core.structures import PartialSolution
+from core.structures import Budget, Instance, PartialSolution, TabuList
 
 
 def test_assignment():
@@ -54,3 +55,143 @@ def test_from_sol():
     assert np.array_equal(ps.solution, [[10, 100], [15], [1, 2, 3]])
     assert ps.is_full
 
+
+def test_incremental_errors():
+    data = [7, 3, 5, 2, 9, 4]
+    ps = PartialSolution(data, 3)
+    for i, j in [(0, 0), (1, 1), (2, 2), (3, 0), (4, 1), (5, 2), (0, 2), (3, 1)]:
+        moved = copy.deepcopy(ps)
+        moved.put_item(i, j)
+        expected_put = ps.squared_error - sum((moved.sums - ps.perfect) ** 2)
+        assert np.isclose(ps.delta_put(i, j), expected_put)
+        ps.put_item(i, j)
+        assert np.isclose(ps.squared_error, sum((ps.sums - ps.perfect) ** 2))
+        assert np.isclose(ps.abs_error, sum(np.abs(ps.sums - ps.perfect)))
+    abs_before = ps.abs_error
+    d = ps.delta_swap(0, 1)
+    s_0, s_1 = ps.find_item(0), ps.find_item(1)
+    ps.put_item(0, s_1)
+    ps.put_item(1, s_0)
+    assert np.isclose(abs_before - ps.abs_error, d)
+    ps.reset_item(4)
+    assert np.isclose(ps.squared_error, sum((ps.sums - ps.perfect) ** 2))
+
+
+def test_shared_instance():
+    instance = Instance([5, 1, 4, 4], 2)
+    assert instance.total == 14 and instance.perfect == 7
+    assert np.array_equal(instance.order, [0, 3, 2, 1])
+    ps = PartialSolution(instance, 2)
+    ps.put_item(0, 1)
+    ps2 = copy.deepcopy(ps)
+    assert ps2.instance is ps.instance
+    assert ps2.cost is ps.cost
+    with pytest.raises(AttributeError):
+        instance.m = 3
+    with pytest.raises(ValueError):
+        instance.values[0] = 1
+
+
+def test_compact_partitioning():
+    assert PartialSolution([1, 2], 2).partitioning.dtype == np.uint8
+    assert PartialSolution([1, 2], 300).partitioning.dtype == np.uint16
+    ps = PartialSolution([1, 2, 3], 2)
+    assert not ps.is_full
+    ps.put_item(0, 0)
+    ps.put_item(1, 1)
+    ps.put_item(2, 1)
+    assert ps.is_full
+    ps2 = copy.copy(ps)
+    ps2.put_item(2, 0)
+    assert ps.find_item(2) == 1
+    assert ps.squared_error == 8 and ps2.squared_error == 2
+    assert not hasattr(ps, '__dict__')
+
+
+def test_budget():
+    budget = Budget(time_limit=60)
+    assert 0 < budget.remaining <= 60
+    assert not budget.tick() and budget.iterations == 1
+    assert Budget(deadline=0).tick()
+
+    found = []
+    budget = Budget(callback=lambda ps: found.append(ps) or len(found) == 2)
+    assert budget.remaining is None
+    assert not budget.improved(PartialSolution([1], 2))
+    assert budget.improved(PartialSolution([1], 2))
+    assert budget.stopped
+
+
+def test_zobrist_hash():
+    ps = PartialSolution([5, 1, 4, 2, 7], 3)
+    h = ps.zobrist_hash
+    # one key per item, keys of (item, set) pairs are mixed from it
+    assert ps.instance.zobrist.shape == (5,)
+    ps.put_item(0, 1)
+    ps.put_item(3, 2)
+    assert ps.hash_put(1, 0) != ps.zobrist_hash
+    expected = ps.hash_put(1, 0)
+    ps.put_item(1, 0)
+    assert ps.zobrist_hash == expected
+    expected = ps.hash_swap(0, 3)
+    ps.put_item(0, 2)
+    ps.put_item(3, 1)
+    assert ps.zobrist_hash == expected
+
+    fresh = PartialSolution.from_partitioning(ps.instance, 3, ps.partitioning)
+    assert fresh.zobrist_hash == ps.zobrist_hash
+    for i in (0, 1, 3):
+        ps.reset_item(i)
+    assert ps.zobrist_hash == h
+
+
+def test_tabu_list():
+    tabu = TabuList(2)
+    tabu.add(1)
+    tabu.add(2)
+    assert 1 in tabu and 2 in tabu
+    tabu.add(1)
+    tabu.add(3)
+    assert 2 not in tabu and 1 in tabu and 3 in tabu
+    tabu.add(4)
+    assert 1 not in tabu and len(tabu) == 2
+
+
+def test_membership_index():
+    rng = np.random.default_rng(0)
+    ps = PartialSolution.from_partitioning(rng.integers(1, 100, 30), 4, rng.integers(0, 4, 30))
+    ps.build_index()
+    ps.start_journal()
+    for i, j in zip(rng.integers(0, 30, 50).tolist(), rng.integers(0, 4, 50).tolist()):
+        ps.put_item(i, j)
+    ps.reset_item(3)
+    ps2 = copy.copy(ps)
+    ps.undo(ps.stop_journal())
+    for p in (ps, ps2):
+        assert p.indexed
+        for j in range(4):
+            assert sorted(p.get_index_list(j)) == np.where(p.partitioning == j)[0].tolist()
+            assert p.find_item(p.random_item(j)) == j
+    assert 3 not in ps2.get_index_list(ps.find_item(3))
+
+
+def test_sum_heaps():
+    rng = np.random.default_rng(1)
+    ps = PartialSolution(rng.integers(0, 5, 60), 7)
+    ps.build_heaps()
+    assert ps.argmin_sum() == 0 and ps.argmax_sum() == 0
+    for i, j in zip(rng.integers(0, 60, 200).tolist(), rng.integers(0, 7, 200).tolist()):
+        ps.put_item(i, j)
+        copied = copy.copy(ps)
+        for p in (ps, copied):
+            assert p.argmin_sum() == np.argmin(p.sums)
+            assert p.argmax_sum() == np.argmax(p.sums)
+
+
+def test_partial_repr():
+    ps = PartialSolution([1, 2, 3], 2)
+    ps.put_item(2, 1)
+    assert not ps.is_full
+    assert '1: 3\n' in repr(ps)
+    with pytest.raises(RuntimeError):
+        ps.solution